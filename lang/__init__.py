@@ -7,4 +7,5 @@
 # Authors:
 # Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
 # Francisco Martinez, 09-10502, <frammnm@gmail.com>
-# ------------------------------------------------------------
\ No newline at end of file
+# ------------------------------------------------------------
+__version__ = "0.0.2"
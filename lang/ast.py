@@ -8,10 +8,12 @@
 # Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
 # Francisco Martinez, 09-10502, <frammnm@gmail.com>
 # ------------------------------------------------------------
+import operator
 import re
-import sys
 from sym_table import * 
 from exceptions import *
+from context import Context
+from matrices import matrices, lists
 
 class Trinity(object):
 
@@ -45,23 +47,26 @@ class Trinity(object):
     def check(self):
         symtab=SymTable()
         for fun in self._functions:
-            symtab.addName(fun.getName(), fun.functionType(), self._position)
+            fun._slot = symtab.addName(fun.getName(), fun.functionType(), self._position)
         if self._functions is not None:
             for fun in self._functions:
                 fun.check(symtab)
         if self._statements is not None:
             for state in self._statements: 
                 state.check(symtab)
+        self._size = symtab.size()
         return symtab
     
-    def execute(self):
-        sym_table=SymTable()
+    def execute(self, context=None):
+        if context is None:
+            context = Context()
+        frame = Frame(self._size, context=context)
         for fun in self._functions:
-            symtab.addName(fun.getName(), fun.functionType(), self._position)
+            frame.setValue((0, fun._slot), fun)
         if self._statements is not None:
             for state in self._statements: 
-                state.execute(sym_table)
-        return sym_table
+                state.execute(frame)
+        return frame
 
 
 class FunctionDefinition(Trinity):
@@ -119,7 +124,36 @@ class FunctionDefinition(Trinity):
                     raise TrinityTypeError(error)
             else:
                 ok = ok and rtype
+        self._size = sym_table.size()
         return ok
+
+    def call(self, arguments, symtab):
+        """
+        Runs the body of the function with the values in 'arguments', in a
+        frame under 'symtab', the one of the whole program. The parameters
+        take the first slots. Returns the value of the return statement
+        reached, or None.
+        """
+        frame = Frame(self._size, symtab)
+        for slot, value in enumerate(arguments):
+            frame.setValue((0, slot), copyValue(value))
+        try:
+            for state in self._statements:
+                state.execute(frame)
+        except FunctionReturn as ret:
+            return ret.value
+        return None
+
+
+class FunctionReturn(Exception):
+    """
+    Raised by a return statement to leave the function being run.
+    """
+
+    def __init__(self, value):
+        super(FunctionReturn, self).__init__()
+        self.value = value
+
              
 class FormalParameter(Trinity):
 
@@ -220,6 +254,18 @@ class Statement(Trinity):
         pass
 
 
+def copyValue(value):
+    """
+    Returns a copy of 'value' if it is a matrix, so variables never share
+    one and a projected assignment only changes its own variable.
+    """
+    if isinstance(value, list):
+        return lists.copy(value)
+    if matrices.isMatrix(value):
+        return matrices.copy(value)
+    return value
+
+
 class PrintStatement(Statement):
 
     def __init__(self, position, printables):
@@ -243,24 +289,25 @@ class PrintStatement(Statement):
     
 
 
-    def printmatrix(list) :
-        sys.stdout.write("{")
+    def printmatrix(self, output, list) :
+        output.write("{")
         for row in list :
             for value in row :
-                sys.stdout.write(" ")
-                sys.stdout.write(str(value))
-                sys.stdout.write(",")
-            sys.stdout.write(":")
-        sys.stdout.write("}")
+                output.write(" ")
+                output.write(str(value))
+                output.write(",")
+            output.write(":")
+        output.write("}")
 
 
     
     def execute(self,symtab):
+        output = symtab.getContext()
         if self._printables is not None:
             for printa in self._printables:
                 value = printa.execute(symtab)
-                if isinstance(value,list):
-                    printmatrix(list)
+                if matrices.isMatrix(value):
+                    self.printmatrix(output, value)
                 elif isinstance(value,str):
                     scaped = False
                     for char in value:
@@ -268,34 +315,34 @@ class PrintStatement(Statement):
                             if char == '\\':
                                 scaped = True
                             else:
-                                sys.stdout.write(char)
+                                output.write(char)
                         else:
                             if char == 'a':
-                                sys.stdout.write('\a')
+                                output.write('\a')
                             elif char == 'b':
-                                sys.stdout.write('\b')
+                                output.write('\b')
                             elif char == 'f':
-                                sys.stdout.write('\f')
+                                output.write('\f')
                             elif char == 'n':
-                                sys.stdout.write('\n')
+                                output.write('\n')
                             elif char == 'r':
-                                sys.stdout.write('\r')
+                                output.write('\r')
                             elif char == 't':
-                                sys.stdout.write('\t')
+                                output.write('\t')
                             elif char == 'v':
-                                sys.stdout.write('\v')
+                                output.write('\v')
                             elif char == '\\':
-                                sys.stdout.write('\\')
+                                output.write('\\')
                             elif char == '"':
-                                sys.stdout.write('"')
+                                output.write('"')
                             scaped = False
 
                 elif (value is True):
-                    sys.stdout.write('True') 
+                    output.write('True') 
                 elif (value is False):
-                    sys.stdout.write('False')
+                    output.write('False')
                 else :
-                    sys.stdout.write(str(value))
+                    output.write(str(value))
         
 class Printable(object):
 
@@ -327,7 +374,8 @@ class StringLiteral(Literal):
         return "%sString Literal: %s" % (self.getIndent(level), repr(self._value))
 
     def check(self, symtab):
-        return String(self._position)
+        self._type = String(self._position)
+        return self._type
 
     def execute(self,symtab):
         return self._value
@@ -350,19 +398,21 @@ class ReadStatement(Statement):
             raise TrinityTypeError(error)
     
     def execute(self,symtab):
-        typer = symtab.lookup(self._variable._id, self._position)
+        typer = self._variable._type
         if (type(typer) is Number):
-            s=raw_input()
+            s=symtab.getContext().readLine()
             pattern = re.compile('[-]?([0-9]+)(\.[0-9]+)?')
             ret = pattern.match(s)
             if ret is not None:
-                symtab.setValue(self._variable._id,ret,self._position)
+                value = ret.group()
+                value = float(value) if '.' in value else int(value)
+                symtab.setValue(self._variable._address, value)
         elif (type(typer) is Boolean):
-            s=raw_input()
+            s=symtab.getContext().readLine()
             pattern = re.compile('(True|False)')
-            ret = pattern.match(pattern,s)
+            ret = pattern.match(s)
             if ret is not None:
-                symtab.setValue(self._variable._id,ret,self._position)
+                symtab.setValue(self._variable._address, ret.group() == 'True')
 
 
 
@@ -392,39 +442,17 @@ class AssignmentStatement(Statement):
             if (type(ltype) is Matrix) & (type(rtype) is Matrix) :
                 if (ltype.rows != rtype.rows) | (ltype.cols != rtype.cols) :
                     error = "In line %d, column %d, matrix sizes don't match. " % self._position
-                    error += "Trying to assing (%d,%d) to (%d,%d)." % (rtype._rows, rtype._cols, ltype._rows, ltype._cols)
+                    error += "Trying to assing (%d,%d) to (%d,%d)." % (rtype.rows, rtype.cols, ltype.rows, ltype.cols)
                     raise TrinityMatrixDimensionError(error)
+        return True
 
     def execute(self, symtab):
         if type(self._lvalue) is Variable:
-            symtab.setValue(self._lvalue._id, self._rvalue.execute(symtab), self._position)
+            symtab.setValue(self._lvalue._address, copyValue(self._rvalue.execute(symtab)))
         elif type(self._lvalue) is ProjectedVariable:
-            if self._lvalue._component is None:
-                matrix = symtab.getValue(self._lvalue._matrix._id, self._position)
-                try:
-                    matrix[int(self._lvalue._row)][int(self._lvalue._col)] = self._rvalue.execute(symtab)
-                except ValueError:
-                    error = "In line %d, column %d, " % self._position
-                    error += "trying to access matrix with a non integer number: (%d, %d)" % (self._row, self._col)
-                    raise TrinityMatrixDimensionAccessError(error)
-            else:
-                type_class, matrix = symtab.get(self._lvalue._matrix._id, self._position)
-                if type(type_class) is Matrix:
-                    if type_class.rows == 0:
-                        try:
-                            matrix[0][int(self._component)] = self._rvalue.execute(symtab)
-                        except ValueError:
-                            error = "In line %d, column %d, " % self._position
-                            error += "trying to access matrix with a non integer number: (%d, %d)" % (self._row, self._col)
-                            raise TrinityMatrixDimensionAccessError(error)
-                    elif type_class.cols == 0:
-                        try:
-                            matrix[int(self._component)][0] = self._rvalue.execute(symtab)
-                        except ValueError:
-                            error = "In line %d, column %d, " % self._position
-                            error += "trying to access matrix with a non integer number: (%d, %d)" % (self._row, self._col)
-                            raise TrinityMatrixDimensionAccessError(error)
-            symtab.setValue(self._lvalue._matrix._id, matrix, self._position)
+            matrix = symtab.getValue(self._lvalue._address)
+            row, col = self._lvalue.cell(self._lvalue._matrix._type, symtab)
+            matrix[row][col] = self._rvalue.execute(symtab)
         return True
 
         
@@ -445,10 +473,12 @@ class Variable(Expression):
 
     
     def check(self, symtab):
-        return symtab.lookup(self._id, self._position)
+        self._type = symtab.lookup(self._id, self._position)
+        self._address = symtab.address(self._id, self._position)
+        return self._type
 
     def execute(self, symtab):
-        return symtab.getValue(self._id, self._position)
+        return symtab.getValue(self._address)
 
 class ProjectedMatrix(Expression):
 
@@ -501,34 +531,21 @@ class ProjectedMatrix(Expression):
             #         error += "matrix has not vectorial dimentions (either rows or columns equals to 1)."
             #         raise TrinityMatrixDimensionError(error)
 
-        return Number(self._position);
+        self._type = Number(self._position)
+        return self._type
 
     def execute(self, symtab):
         matrix = self._matrix.execute(symtab)
-        result = None
         if self._component is None:
-            try:
-                result =  matrix[int(self._row)][int(self._col)]
-            except ValueError:
-                error = "In line %d, column %d, " % self._position
-                error += "trying to access matrix with a non integer number: (%d, %d)" % (self._row, self._col)
-                raise TrinityMatrixDimensionAccessError(error)
+            row = projectionIndex(self._row.execute(symtab), len(matrix), self._position)
+            col = projectionIndex(self._col.execute(symtab), len(matrix[0]), self._position)
+        elif len(matrix) == 1:
+            row = 0
+            col = projectionIndex(self._component.execute(symtab), len(matrix[0]), self._position)
         else:
-            if len(matrix) == 0:
-                try:
-                    result =  matrix[0][int(self._component)]
-                except ValueError:
-                    error = "In line %d, column %d, " % self._position
-                    error += "trying to access matrix with a non integer number: (%d, %d)" % (self._row, self._col)
-                    raise TrinityMatrixDimensionAccessError(error)
-            elif len(matrix[0]) == 0:
-                try:
-                    result =  matrix[int(self._component)][0]
-                except ValueError:
-                    error = "In line %d, column %d, " % self._position
-                    error += "trying to access matrix with a non integer number: (%d, %d)" % (self._row, self._col)
-                    raise TrinityMatrixDimensionAccessError(error)
-        return result
+            row = projectionIndex(self._component.execute(symtab), len(matrix), self._position)
+            col = 0
+        return matrix[row][col]
 
 
 class ProjectedVector(ProjectedMatrix):
@@ -574,6 +591,7 @@ class ProjectedVariable(Expression):
             error = "Trying to project non-matrix variable " 
             raise TrinityTypeError(error)
         matrix_type = self._matrix.check(symtab)
+        self._address = self._matrix._address
         if self._component is None:
             if type(self._row.check(symtab)) is not Number:
                 error = "In line %d, column %d, " % self._position
@@ -592,37 +610,42 @@ class ProjectedVariable(Expression):
             #     error = "In line %d, column %d, " % self._position
             #     error += "matrix has not vectorial dimentions (either rows or columns equals to 1)."
             #    raise TrinityMatrixDimensionError(error)
-        return Number(self._position);
+        self._type = Number(self._position)
+        return self._type
 
-    def execute(self, symtab):
-        result = None
+    def cell(self, type_class, symtab):
+        """
+        Returns the row and column, counted from 0, of the projected cell of
+        a matrix of type 'type_class'. A vector is projected along its only
+        row or column.
+        """
         if self._component is None:
-            matrix = self._matrix.execute(symtab)
-            try:
-                result =  matrix[int(self._row)][int(self._col)]
-            except ValueError:
-                error = "In line %d, column %d, " % self._position
-                error += "trying to access matrix with a non integer number: (%d, %d)" % (self._row, self._col)
-                raise TrinityMatrixDimensionAccessError(error)
+            row = projectionIndex(self._row.execute(symtab), type_class.rows, self._position)
+            col = projectionIndex(self._col.execute(symtab), type_class.cols, self._position)
+        elif type_class.rows == 1:
+            row = 0
+            col = projectionIndex(self._component.execute(symtab), type_class.cols, self._position)
         else:
-            type_class, matrix = symtab.get(self._matrix._id, self._position)
-            if type(type_class) is Matrix:
-                if type_class.rows == 0:
-                    try:
-                        result =  matrix[0][int(self._component)]
-                    except ValueError:
-                        error = "In line %d, column %d, " % self._position
-                        error += "trying to access matrix with a non integer number: (%d, %d)" % (self._row, self._col)
-                        raise TrinityMatrixDimensionAccessError(error)
-                elif type_class.cols == 0:
-                    try:
-                        result =  matrix[int(self._component)][0]
-                    except ValueError:
-                        error = "In line %d, column %d, " % self._position
-                        error += "trying to access matrix with a non integer number: (%d, %d)" % (self._row, self._col)
-                        raise TrinityMatrixDimensionAccessError(error)
-        return result
+            row = projectionIndex(self._component.execute(symtab), type_class.rows, self._position)
+            col = 0
+        return (row, col)
+
+    def execute(self, symtab):
+        matrix = symtab.getValue(self._address)
+        row, col = self.cell(self._matrix._type, symtab)
+        return matrix[row][col]
+
 
+def projectionIndex(value, size, position):
+    """
+    Returns the index, counted from 0, of the Trinity index 'value', which
+    is counted from 1, of a row or column of 'size' elements.
+    """
+    if value != int(value) or not 1 <= value <= size:
+        error = "In line %d, column %d, " % position
+        error += "trying to access a matrix out of its bounds, or with a non integer number: %s" % value
+        raise TrinityMatrixDimensionAccessError(error)
+    return int(value) - 1
 
 
 class ReturnStatement(Statement):
@@ -645,10 +668,13 @@ class ReturnStatement(Statement):
             ret_type = self._expression.check(symtab)
             if not ret_type.compare(symtab.getFunctionType()):
                 error = "In line %d, column %d, " % self._position
-                error += "return expression type (%s) is not the function return type (%s)." % ret_type, symtab.getFunctionType()
+                error += "return expression type (%s) is not the function return type (%s)." % (ret_type, symtab.getFunctionType())
                 raise TrinityTypeError(error)
         return ret_type
 
+    def execute(self, symtab):
+        raise FunctionReturn(self._expression.execute(symtab))
+
 class DiscardedExpression(Statement):
 
     def __init__(self, position, expression):
@@ -665,8 +691,9 @@ class DiscardedExpression(Statement):
             exp_type = self._expression.check(symtab)
         return True
 
-    def check(self, symtab):
-        return self._expression.execute(symtab)
+    def execute(self, symtab):
+        self._expression.execute(symtab)
+        return True
 
 
 class IfStatement(Statement):
@@ -698,7 +725,7 @@ class IfStatement(Statement):
         if type(self._condition.check(symtab))is not Boolean:
             error = "In line %d, column %d, " % self._position
             error += "'If' statement condition is not boolean."
-            raise TrinityTypeError(message)
+            raise TrinityTypeError(error)
         if self._statements is not None and self._statements != []:
             for statement in self._statements:
                 statement.check(symtab)
@@ -748,22 +775,23 @@ class ForStatement(Statement):
             error += "'for' statement iterable expression is not Matrix."
             raise TrinityTypeError(error)
         sym_table = SymTable(father=symtab)
-        sym_table.addName(self._item, Number(self._position), self._position)
+        self._slot = sym_table.addName(self._item, Number(self._position), self._position)
         for state in self._statements: 
             state.check(sym_table)
+        self._size = sym_table.size()
         return True
     
     def execute(self,symtab):
         if self._iterable is not None:
             m = self._iterable.execute(symtab)
-        sym_table = SymTable(father=symtab)
-        sym_table.addName(self._item, Number(self._position), self._position)
+        frame = Frame(self._size, symtab)
+        address = (0, self._slot)
         if self._statements is not None and self._statements != []:
             for i in range(len(m)):
                 for j in range(len(m[0])):
-                    sym_table.setValue(self._item, m[i][j], self._position)
+                    frame.setValue(address, m[i][j])
                     for state in self._statements:
-                        state.execute(sym_table)
+                        state.execute(frame)
         return True
                               
            
@@ -835,16 +863,17 @@ class BlockStatement(Statement):
         if self._statements is not None :
             for state in self._statements:
                 state.check(sym_table)
+        self._size = sym_table.size()
         return True
             
     def execute(self,symtab):
-        sym_table=SymTable(father=symtab)
+        frame = Frame(self._size, symtab)
         if self._declared_vars is not None and self._declared_vars != []:
             for declared in self._declared_vars:
-                declared.execute(sym_table)
+                declared.execute(frame)
         if self._statements is not None:
             for state in self._statements:
-                state.execute(sym_table)
+                state.execute(frame)
         return True
                     
 
@@ -862,11 +891,11 @@ class VariableDeclaration(Trinity):
         return string
 
     def check(self,symtab):
-        symtab.addName(self._id, self._type, self._position)
+        self._address = (0, symtab.addName(self._id, self._type, self._position))
         return self._type
 
     def execute(self, symtab):
-        symtab.addName(self._id, self._type, self._position)
+        symtab.setValue(self._address, self._type.initialValue())
         return True
 
 class VariableDeclarationAssign(VariableDeclaration):
@@ -884,17 +913,21 @@ class VariableDeclarationAssign(VariableDeclaration):
         return string
     
     def check(self,symtab):
+        # The name is declared before its value is computed, so the value
+        # refers to the new variable, although its type is the one of the
+        # outer name
+        symtab.reserve(self._id)
         rtype=self._rvalue.check(symtab)
         if not rtype.compare(self._type):
             error = "In line %d, column %d, " % self._position
             error += "trying to assing %s to %s" % (rtype.__str__(), self._type.__str__())
             raise TrinityTypeError(error)
-        symtab.addName(self._id, self._type, self._position)
+        self._address = (0, symtab.addName(self._id, self._type, self._position))
         return self._type
 
     def execute(self, symtab):
         super(VariableDeclarationAssign, self).execute(symtab)
-        symtab.setValue(self._id, self._rvalue.execute(symtab), self._position)
+        symtab.setValue(self._address, copyValue(self._rvalue.execute(symtab)))
         return self._type
 
 class TrueLiteral(Literal, Expression):
@@ -908,6 +941,7 @@ class TrueLiteral(Literal, Expression):
 
     def check(self,symtab):
         t = Boolean(self._position)
+        self._type = t
         return t
 
     def execute(self, symtab):
@@ -924,6 +958,7 @@ class FalseLiteral(Literal, Expression):
 
     def check(self, symtab):
         t = Boolean(self._position)
+        self._type = t
         return t
 
     def execute(self, symtab):
@@ -935,6 +970,7 @@ class NumberLiteral(Literal, Expression):
     def __init__(self, position, value):
         self._position = position
         self._value = value
+        self._number = float(value) if '.' in value else int(value)
 
     def printAST(self, level):
         string = "%sNumber Literal: %s" % (self.getIndent(level), self._value)
@@ -942,10 +978,11 @@ class NumberLiteral(Literal, Expression):
 
     def check(self, symtab):
         t = Number(self._position)
+        self._type = t
         return t
 
     def execute(self, symtab):
-        return self._value
+        return self._number
 
 class MatrixLiteral(Literal, Expression):
 
@@ -974,7 +1011,7 @@ class MatrixLiteral(Literal, Expression):
                     if type(elm.check(symtab)) is not Number : 
                         error = "In line %d, column %d, " % elm.getPosition()
                         error += "non-numeric value in matrix literal."
-                        raise TrinityTypeError(message)
+                        raise TrinityTypeError(error)
                 if cols is None:
                     cols = len(row)
                 else:
@@ -982,10 +1019,11 @@ class MatrixLiteral(Literal, Expression):
                         error = "In line %d, column %d, " % self._position
                         error += "column number doesn't match."
                         raise TrinityMatrixDimensionError(error)
-        return Matrix(rows, cols, self._position)
+        self._type = Matrix(rows, cols, self._position)
+        return self._type
 
     def execute(self, symtab):
-        return self._matrix
+        return matrices.matrix([[elem.execute(symtab) for elem in row] for row in self._matrix])
 
 class FunctionCall(Expression):
 
@@ -1005,6 +1043,7 @@ class FunctionCall(Expression):
 
     def check(self,symtab):
         fun_type = symtab.lookup(self._id,self._position)
+        self._address = symtab.address(self._id, self._position)
         if self._arguments is not None:
             if len(self._arguments) != fun_type.n_args:
                 error = "In line %d, column %d, " % self._position
@@ -1017,7 +1056,13 @@ class FunctionCall(Expression):
                     error += "type of arguments doesn't match. "
                     error += "Passed %s and %s was expected." % (self._arguments[i], fun_type.args_types[i])
                     raise TrinityTypeError(error)
-        return fun_type.return_type
+        self._type = fun_type.return_type
+        return self._type
+
+    def execute(self, symtab):
+        arguments = [arg.execute(symtab) for arg in self._arguments]
+        function = symtab.getValue(self._address)
+        return function.call(arguments, symtab.getRoot())
 
 
 
@@ -1042,6 +1087,17 @@ class BinaryExpression(Expression):
     def execute(self, symtab):
         return self._function(self._left, self._right, symtab)
 
+    # The operation is a static method of the class of the node, so it is
+    # pickled by its name
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_function'] = self._function.__name__
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._function = getattr(type(self), self._function)
+
 class Sum(BinaryExpression):
 
     def __init__(self, position, left, right):
@@ -1053,19 +1109,15 @@ class Sum(BinaryExpression):
         e1 = left.execute(symtab)
         e2 = right.execute(symtab)
         if type(left._type) is Matrix and type(right._type) is Matrix:
-            result = Matrix.ones(len(e1), len(e1[0]))
-            for i in range(len(e1)):
-                for j in range(len(e1[0])):
-                    result[i][j] = e1[i][j] + e2[i][j]
-            return result
+            return matrices.add(e1, e2)
         elif type(left._type) is Number and type(right._type) is Number:
             return e1 + e2
 
     def check(self, symtab):
         ltype = self._left.check(symtab)
-        print ltype
         rtype = self._right.check(symtab)
         if (type(ltype) is Number) and (type(rtype) is Number) :
+            self._type = rtype
             return rtype
         elif (type(ltype) is Matrix) and (type(rtype) is Matrix):
             if ltype.rows != rtype.rows or ltype.cols != rtype.cols:
@@ -1077,8 +1129,9 @@ class Sum(BinaryExpression):
                     rtype.rows,
                     rtype.cols
                     )
-                raise TrinityMathDimensionError(error)
-            else :
+                raise TrinityMatrixDimensionError(error)
+            else:
+                self._type = ltype
                 return ltype
         else:
             error = "In line %d, column %d, " % self._position
@@ -1097,11 +1150,7 @@ class Subtraction(BinaryExpression):
         e1 = left.execute(symtab)
         e2 = right.execute(symtab)
         if type(left._type) is Matrix and type(right._type) is Matrix:
-            result = Matrix.ones(len(e1), len(e1[0]))
-            for i in range(len(e1)):
-                for j in range(len(e1[0])):
-                    result[i][j] = e1[i][j] - e2[i][j]
-            return result
+            return matrices.subtract(e1, e2)
         elif type(left._type) is Number and type(right._type) is Number:
             return e1 - e2
 
@@ -1109,6 +1158,7 @@ class Subtraction(BinaryExpression):
         ltype = self._left.check(symtab)
         rtype = self._right.check(symtab)
         if (type(ltype) is Number) and ( type(rtype) is Number) :
+            self._type = rtype
             return rtype
         elif (type(ltype) is Matrix) and (type(rtype) is Matrix):
             if ltype.rows != rtype.rows or ltype.cols != rtype.cols :
@@ -1122,6 +1172,7 @@ class Subtraction(BinaryExpression):
                     )
                 raise TrinityMatrixDimensionError(error)
             else:
+                self._type = ltype
                 return ltype
         else:
             error = "In line %d, column %d, " % self._position
@@ -1148,24 +1199,21 @@ class Times(BinaryExpression):
     def matrix_multiply(left, right):
         """
         Computes dot product. An MxP matrix with an PxN matrix, resulting in an
-        MxN matrix.
+        MxN matrix. The matrices are lists of rows, or values of the matrices
+        in use.
         """
-        from itertools import product
-        cols, rows = len(right[0]), len(right)
-        result_rows = xrange(len(left))
-        result_matrix = [[0] * cols for _ in result_rows]
-        for i in result_rows:
-            for j, k in product(xrange(cols), xrange(rows)):
-                result_matrix[i][j] += left[i][k] * right[k][j]
-        return result_matrix
+        if isinstance(left, list):
+            return lists.product(left, right)
+        return matrices.product(left, right)
     
     def check(self, symtab):
         ltype = self._left.check(symtab)
         rtype = self._right.check(symtab)
         if (type(ltype) is Number) and ( type(rtype) is Number) :
+            self._type = rtype
             return rtype
         elif (type(ltype) is Matrix) and (type(rtype) is Matrix):
-            if ltype.rows != rtype.cols or ltype.cols != rtype.rows:
+            if ltype.cols != rtype.rows:
                 error = "In line %d, column %d, " % self._position
                 error += "Matrix rows or cols don't match. "
                 error += "Trying to multiply (%d,%d) by (%d,%d)." % (
@@ -1175,6 +1223,8 @@ class Times(BinaryExpression):
                     rtype.cols
                     )
                 raise TrinityMatrixDimensionError(error)
+            self._type = Matrix(ltype.rows, rtype.cols, self._position)
+            return self._type
         else:
             error = "In line %d, column %d, " % self._position
             error =  "Trying to multiply (*) a '%s' expression by a '%s' expression." % (ltype.__str__(),rtype.__str__())  
@@ -1203,6 +1253,7 @@ class Division(BinaryExpression):
         ltype = self._left.check(symtab)
         rtype = self._right.check(symtab)
         if (type(ltype) is Number) & (type(rtype) is Number) :
+            self._type = rtype
             return rtype
         elif (type(ltype) is Matrix) or (type(rtype) is Matrix):
             error = "Can't apply (div) to matrices "  
@@ -1235,6 +1286,7 @@ class Modulus(BinaryExpression):
         ltype = self._left.check(symtab)
         rtype = self._right.check(symtab)
         if (type(ltype) is Number) and (type(rtype) is Number) :
+            self._type = rtype
             return rtype
         elif (type(ltype) is Matrix) or (type(rtype) is Matrix):
             error = "Can't apply (mod) to matrices "  
@@ -1267,6 +1319,7 @@ class RealDivision(BinaryExpression):
         ltype = self._left.check(symtab)
         rtype = self._right.check(symtab)
         if (type(ltype) is Number) and ( type(rtype) is Number) :            
+            self._type = rtype
             return rtype
         elif (type(ltype) is Matrix) or (type(rtype) is Matrix):
             error = "Can't apply (/) to matrices "  
@@ -1322,11 +1375,11 @@ class MatrixSum(BinaryExpression):
         if type(left._type) is Matrix:
             matrix = left.execute(symtab)
             scalar = right.execute(symtab)
-            return map(lambda x: map(lambda y: y + scalar, x), matrix)
+            return matrices.scalar(matrix, scalar, operator.add)
         elif type(right._type) is Matrix:
             matrix = right.execute(symtab)
             scalar =left.execute(symtab)
-            return map(lambda x: map(lambda y: scalar  +y, x), matrix)
+            return matrices.scalarLeft(matrix, scalar, operator.add)
 
     def check(self, symtab):
         ltype = self._left.check(symtab)
@@ -1354,11 +1407,11 @@ class MatrixSubtraction(BinaryExpression):
         if type(left._type) is Matrix:
             matrix = left.execute(symtab)
             scalar = right.execute(symtab)
-            return map(lambda x: map(lambda y: y - scalar, x), matrix)
+            return matrices.scalar(matrix, scalar, operator.sub)
         elif type(right._type) is Matrix:
             matrix = right.execute(symtab)
             scalar =left.execute(symtab)
-            return map(lambda x: map(lambda y: scalar - y, x), matrix)
+            return matrices.scalarLeft(matrix, scalar, operator.sub)
 
     def check(self, symtab):
         ltype = self._left.check(symtab)
@@ -1386,11 +1439,11 @@ class MatrixTimes(BinaryExpression):
         if type(left._type) is Matrix:
             matrix = left.execute(symtab)
             scalar = right.execute(symtab)
-            return map(lambda x: map(lambda y: y * scalar, x), matrix)
+            return matrices.scalar(matrix, scalar, operator.mul)
         elif type(right._type) is Matrix:
             matrix = right.execute(symtab)
             scalar =left.execute(symtab)
-            return map(lambda x: map(lambda y: scalar * y, x), matrix)
+            return matrices.scalarLeft(matrix, scalar, operator.mul)
 
     def check(self, symtab):
         ltype = self._left.check(symtab)
@@ -1419,7 +1472,7 @@ class MatrixDivision(BinaryExpression):
             matrix = left.execute(symtab)
             scalar = right.execute(symtab)
             try :
-                result = map(lambda x: map(lambda y: y // scalar, x), matrix)
+                result = matrices.scalar(matrix, scalar, operator.floordiv)
             except ZeroDivisionError as zde:
                 error = "In line %d, column %d, " % right._position
                 error += "trying to compute a zero division."
@@ -1429,7 +1482,7 @@ class MatrixDivision(BinaryExpression):
             matrix = right.execute(symtab)
             scalar =left.execute(symtab)
             try :
-                result = map(lambda x: map(lambda y: scalar // y, x), matrix)
+                result = matrices.scalarLeft(matrix, scalar, operator.floordiv)
             except ZeroDivisionError as zde:
                 error = "In line %d, column %d, " % right._position
                 error += "trying to compute a zero division."
@@ -1463,7 +1516,7 @@ class MatrixModulus(BinaryExpression):
             matrix = left.execute(symtab)
             scalar = right.execute(symtab)
             try :
-                result = map(lambda x: map(lambda y: y % scalar, x), matrix)
+                result = matrices.scalar(matrix, scalar, operator.mod)
             except ZeroDivisionError as zde:
                 error = "In line %d, column %d, " % right._position
                 error += "trying to compute a zero division."
@@ -1473,7 +1526,7 @@ class MatrixModulus(BinaryExpression):
             matrix = right.execute(symtab)
             scalar =left.execute(symtab)
             try :
-                result = map(lambda x: map(lambda y: scalar % y, x), matrix)
+                result = matrices.scalarLeft(matrix, scalar, operator.mod)
             except ZeroDivisionError as zde:
                 error = "In line %d, column %d, " % right._position
                 error += "trying to compute a zero division."
@@ -1508,7 +1561,7 @@ class MatrixRealDivision(BinaryExpression):
             matrix = left.execute(symtab)
             scalar = right.execute(symtab)
             try :
-                result = map(lambda x: map(lambda y: y / scalar, x), matrix)
+                result = matrices.scalar(matrix, scalar, operator.div)
             except ZeroDivisionError as zde:
                 error = "In line %d, column %d, " % right._position
                 error += "trying to compute a zero division."
@@ -1518,7 +1571,7 @@ class MatrixRealDivision(BinaryExpression):
             matrix = right.execute(symtab)
             scalar =left.execute(symtab)
             try :
-                result = map(lambda x: map(lambda y: scalar / y, x), matrix)
+                result = matrices.scalarLeft(matrix, scalar, operator.div)
             except ZeroDivisionError as zde:
                 error = "In line %d, column %d, " % right._position
                 error += "trying to compute a zero division."
@@ -1553,7 +1606,7 @@ class MatrixRealModulus(BinaryExpression):
             matrix = left.execute(symtab)
             scalar = right.execute(symtab)
             try :
-                result = map(lambda x: map(lambda y: y % scalar, x), matrix)
+                result = matrices.scalar(matrix, scalar, operator.mod)
             except ZeroDivisionError as zde:
                 error = "In line %d, column %d, " % right._position
                 error += "trying to compute a zero division."
@@ -1563,7 +1616,7 @@ class MatrixRealModulus(BinaryExpression):
             matrix = right.execute(symtab)
             scalar =left.execute(symtab)
             try :
-                result = map(lambda x: map(lambda y: scalar % y, x), matrix)
+                result = matrices.scalarLeft(matrix, scalar, operator.mod)
             except ZeroDivisionError as zde:
                 error = "In line %d, column %d, " % right._position
                 error += "trying to compute a zero division."
@@ -1595,6 +1648,8 @@ class Equivalence(BinaryExpression):
     def equivalence(left, right, symtab):
         e1 = left.execute(symtab)
         e2 = right.execute(symtab)
+        if type(left._type) is Matrix:
+            return matrices.equal(e1, e2)
         return e1 == e2
 
     def check(self, symtab):
@@ -1619,6 +1674,8 @@ class NotEquivalence(BinaryExpression):
     def not_equivalence(left, right, symtab):
         e1 = left.execute(symtab)
         e2 = right.execute(symtab)
+        if type(left._type) is Matrix:
+            return not matrices.equal(e1, e2)
         return e1 != e2
    
     def check(self, symtab):
@@ -1635,7 +1692,7 @@ class NotEquivalence(BinaryExpression):
         else:
             error = "In line %d, column %d, " % self._position
             error =  "Trying to compare (/=) a '%s' expression with a '%s' expression." % (ltype.__str__(),rtype.__str__())
-            raise TrinityTypeException(message)
+            raise TrinityTypeError(error)
 
 
 class GreaterOrEqual(BinaryExpression):
@@ -1797,6 +1854,15 @@ class UnaryExpression(Expression):
     def execute(self, symtab):
         return self._function(self._operand, symtab)
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_function'] = self._function.__name__
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._function = getattr(type(self), self._function)
+
 
 class UnaryMinus(UnaryExpression):
     
@@ -1808,7 +1874,7 @@ class UnaryMinus(UnaryExpression):
     def unary_minus(expression, symtab):
         operand = expression.execute(symtab)
         if type(expression._type) is Matrix:
-            return map(lambda x: map(lambda y: - y, x), operand)
+            return matrices.negate(operand)
         else:
             return - operand
         
@@ -1828,27 +1894,26 @@ class Transpose(UnaryExpression):
 
     @staticmethod
     def transpose(expression, symtab=None):
-        matrix = expression.execute(symtab)
-        transposed = ones(len(matrix[1]),len(matrix))
-        for i in range(len(matrix)):
-            for j in range(len(matrix[1])):
-                transposed[j][i] = matrix[i][j]
-        return transposed
+        return matrices.transpose(expression.execute(symtab))
 
     def check(self,symtab):
         otype = self._operand.check(symtab)
         if type(otype) is not Matrix:
             raise TrinityTypeError("Can't apply traspose to non-matrix expression ") 
         else:
-            self._type = otype
-            return otype
+            self._type = Matrix(otype.cols, otype.rows, self._position)
+            return self._type
 
         
 class Not(UnaryExpression):
     
     def __init__(self, position, operand):
-        super(Not, self).__init__(position, lambda expression, symtab: not expression.execute(symtab), operand)
+        super(Not, self).__init__(position, Not.not_func, operand)
         self._operation = "Not"
+
+    @staticmethod
+    def not_func(expression, symtab):
+        return not expression.execute(symtab)
     
     def check(self,symtab):
         otype = self._operand.check(symtab)
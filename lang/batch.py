@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# batch.py
+#
+# Runs many Trinity programs with a single interpreter, or
+# with a pool of them
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+from interpreter import Interpreter, ERR_BAD_FILENAME, UNCAUGHT_EXCEPTION
+from context import Context
+
+import errno
+import itertools
+import multiprocessing
+import os
+import traceback
+
+def readManifest(filename):
+    """
+    Returns the jobs listed in a manifest: a file with a program in each
+    line, optionally followed by a file to be used as its standard input.
+    Blank lines and lines starting with '#' are skipped.
+    """
+    jobs = []
+    manifest = open(filename, 'r')
+    try:
+        for line in manifest:
+            fields = line.split()
+            if len(fields) == 0 or fields[0].startswith('#'):
+                continue
+            jobs += [(fields[0], fields[1] if len(fields) > 1 else None)]
+    finally:
+        manifest.close()
+    return jobs
+
+
+class Batch(object):
+    """
+    Runs a list of jobs, (program, input) pairs, one after the other or in a
+    pool of 'workers' processes. The standard output and error of each
+    program are written to their own files in 'output_dir', named after the
+    position of the job in the list and the program. Its standard input is
+    read from 'input', or is empty.
+
+    'options' are given to the Interpreter of each process, which is built
+    once and used for all the jobs that process runs.
+
+    If a 'timeout', in seconds, or a 'memory_limit', in bytes, is given,
+    each program is run isolated in its own process by a ForkServer, and
+    killed if it goes over them.
+    """
+
+    def __init__(self, jobs, output_dir, workers=None, timeout=None, memory_limit=None, **options):
+        self._jobs = jobs
+        self._output_dir = output_dir
+        self._workers = workers
+        self._timeout = timeout
+        self._memory_limit = memory_limit
+        self._options = options
+        try:
+            os.makedirs(output_dir)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    def outputName(self, index, program):
+        name = "%04d-%s" % (index + 1, os.path.basename(program))
+        return os.path.join(self._output_dir, name)
+
+    def run(self):
+        """
+        Runs the jobs, and yields the program, exit status and output name
+        of each one, in the order of the list, as they finish.
+        """
+        tasks = [(self._options, program, input, self.outputName(index, program))
+                 for index, (program, input) in enumerate(self._jobs)]
+        if self._timeout is not None or self._memory_limit is not None:
+            return self._runIsolated(tasks)
+        return self._runShared(tasks)
+
+    def _runShared(self, tasks):
+        # The parser is built before the pool is started, so every worker
+        # inherits it instead of building its own
+        interpreter(self._options).getParser()
+        if self._workers is None:
+            results = (runJob(task) for task in tasks)
+        else:
+            pool = multiprocessing.Pool(self._workers)
+            results = pool.imap(runJob, tasks)
+        try:
+            for (options, program, input, output), status in itertools.izip(tasks, results):
+                yield (program, status, output)
+        finally:
+            if self._workers is not None:
+                pool.terminate()
+                pool.join()
+
+    def _runIsolated(self, tasks):
+        from forkserver import ForkServer, Job
+        jobs = []
+        statuses = {}
+        for options, program, input, output in tasks:
+            try:
+                stdin = open(input if input is not None else os.devnull, 'r')
+            except IOError as e:
+                statuses[output] = (ERR_BAD_FILENAME, '', "trinity: IOError: %s\n" % str(e))
+                continue
+            try:
+                jobs += [(output, Job(program, stdin.read()))]
+            finally:
+                stdin.close()
+        server = ForkServer(self._workers, self._timeout, self._memory_limit, **self._options)
+        server.run([job for output, job in jobs])
+        for output, job in jobs:
+            statuses[output] = (job.getStatus(), job.getOutput(), job.getErrors())
+        for options, program, input, output in tasks:
+            status, stdout, stderr = statuses[output]
+            for name, contents in ((output + '.out', stdout), (output + '.err', stderr)):
+                stream = open(name, 'w')
+                try:
+                    stream.write(contents)
+                finally:
+                    stream.close()
+            yield (program, status, output)
+
+
+_interpreters = {}
+
+def interpreter(options):
+    """
+    Returns the Interpreter of this process for 'options'.
+    """
+    key = tuple(sorted(options.items()))
+    if key not in _interpreters:
+        _interpreters[key] = Interpreter(**options)
+    return _interpreters[key]
+
+def runJob(task):
+    """
+    Runs one program with its output and input in its own files, and
+    returns its exit status. Exceptions the interpreter does not handle are
+    printed to the error file of the program, as python would.
+    """
+    options, program, input, output = task
+    runner = interpreter(options)
+
+    stdout = open(output + '.out', 'w')
+    stderr = open(output + '.err', 'w')
+    try:
+        try:
+            stdin = open(input if input is not None else os.devnull, 'r')
+        except IOError as e:
+            stderr.write("trinity: IOError: %s\n" % str(e))
+            return ERR_BAD_FILENAME
+        try:
+            return runner.runFile(program, Context(stdout, stdin))
+        except Exception:
+            traceback.print_exc(file=stderr)
+            return UNCAUGHT_EXCEPTION
+        finally:
+            stdin.close()
+    finally:
+        stdout.close()
+        stderr.close()
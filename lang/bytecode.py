@@ -0,0 +1,601 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# bytecode.py
+#
+# Compiler of checked Trinity trees into register based
+# bytecode, and its disassembler
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+from ast import *
+from sym_table import Boolean, Number, Matrix
+from closures import unescape
+
+import array
+import operator
+
+# Each instruction is its opcode followed by its operands, all of them
+# integers in the code of a function. The operands are registers (r),
+# entries of the constant pool (k), plain numbers (n), addresses of
+# instructions (t) or functions of the program (f).
+
+MOVE = 0    # r r         r1 = r2
+COPY = 1    # r r         r1 = copy of the matrix r2
+ZEROS = 2   # r n n       r1 = matrix of n1 rows and n2 columns of zeros
+MATRIX = 3  # r n n r     r1 = matrix of n1 rows and n2 columns, from r2 on
+ADD = 4     # r r r       r1 = r2 + r3
+SUB = 5     # r r r       r1 = r2 - r3
+MUL = 6     # r r r       r1 = r2 * r3
+DIV = 7     # r r r k     r1 = r2 div r3, at position k
+MOD = 8     # r r r k     r1 = r2 mod r3, at position k
+RDIV = 9    # r r r k     r1 = r2 / r3, at position k
+EQ = 10     # r r r       r1 = r2 == r3
+NE = 11     # r r r       r1 = r2 /= r3
+LT = 12     # r r r       r1 = r2 < r3
+LE = 13     # r r r       r1 = r2 <= r3
+GT = 14     # r r r       r1 = r2 > r3
+GE = 15     # r r r       r1 = r2 >= r3
+AND = 16    # r r r       r1 = r2 & r3
+OR = 17     # r r r       r1 = r2 | r3
+NOT = 18    # r r         r1 = not r2
+NEG = 19    # r r         r1 = - r2
+MADD = 20   # r r r       r1 = matrix r2 + matrix r3
+MSUB = 21   # r r r       r1 = matrix r2 - matrix r3
+MMUL = 22   # r r r       r1 = matrix r2 * matrix r3
+MNEG = 23   # r r         r1 = - matrix r2
+TRANS = 24  # r r         r1 = matrix r2 transposed
+MAP = 25    # r r r k k   r1 = operation k1 of each element of r2 and r3, at position k2
+RMAP = 26   # r r r k k   r1 = operation k1 of r3 and each element of r2, at position k2
+IDX = 27    # r r n k     r1 = index from 0 of the projection r2 of size n, at position k
+GET = 28    # r r r r     r1 = element of the matrix r2 at row r3 and column r4
+SET = 29    # r r r r     element of the matrix r1 at row r2 and column r3 = r4
+PROJM = 30  # r r r r k   r1 = r2[r3,r4], at position k
+PROJV = 31  # r r r k     r1 = r2[r3], at position k
+JUMP = 32   # t           go to t
+JUMPF = 33  # r t         go to t if r1 is false
+ITER = 34   # r r         r1 = the elements of the matrix r2, row after row
+NEXT = 35   # r r t       r1 = next element of r2, or go to t when there are none
+CALL = 36   # r f r n     r1 = function f with the n arguments from r2 on
+RET = 37    # r           return r1
+RETN = 38   #             return nothing
+PRINT = 39  # r           print r1
+WRITE = 40  # k           print the string k
+READN = 41  # r           read a number into r1
+READB = 42  # r           read a boolean into r1
+
+_instructions = [
+    ('MOVE', 'rr'), ('COPY', 'rr'), ('ZEROS', 'rnn'), ('MATRIX', 'rnnr'),
+    ('ADD', 'rrr'), ('SUB', 'rrr'), ('MUL', 'rrr'),
+    ('DIV', 'rrrk'), ('MOD', 'rrrk'), ('RDIV', 'rrrk'),
+    ('EQ', 'rrr'), ('NE', 'rrr'), ('LT', 'rrr'), ('LE', 'rrr'), ('GT', 'rrr'), ('GE', 'rrr'),
+    ('AND', 'rrr'), ('OR', 'rrr'), ('NOT', 'rr'), ('NEG', 'rr'),
+    ('MADD', 'rrr'), ('MSUB', 'rrr'), ('MMUL', 'rrr'), ('MNEG', 'rr'), ('TRANS', 'rr'),
+    ('MAP', 'rrrkk'), ('RMAP', 'rrrkk'),
+    ('IDX', 'rrnk'), ('GET', 'rrrr'), ('SET', 'rrrr'), ('PROJM', 'rrrrk'), ('PROJV', 'rrrk'),
+    ('JUMP', 't'), ('JUMPF', 'rt'), ('ITER', 'rr'), ('NEXT', 'rrt'),
+    ('CALL', 'rfrn'), ('RET', 'r'), ('RETN', ''),
+    ('PRINT', 'r'), ('WRITE', 'k'), ('READN', 'r'), ('READB', 'r'),
+    ]
+
+_numbers = {
+    Sum: ADD,
+    Subtraction: SUB,
+    Times: MUL,
+    Division: DIV,
+    Modulus: MOD,
+    RealDivision: RDIV,
+    RealModulus: MOD,
+    Equivalence: EQ,
+    NotEquivalence: NE,
+    Less: LT,
+    LessOrEqual: LE,
+    Greater: GT,
+    GreaterOrEqual: GE,
+    And: AND,
+    Or: OR,
+    }
+
+_matrices = {
+    Sum: MADD,
+    Subtraction: MSUB,
+    Times: MMUL,
+    }
+
+_scalars = {
+    MatrixSum: operator.add,
+    MatrixSubtraction: operator.sub,
+    MatrixTimes: operator.mul,
+    MatrixDivision: operator.floordiv,
+    MatrixModulus: operator.mod,
+    MatrixRealDivision: operator.div,
+    MatrixRealModulus: operator.mod,
+    }
+
+
+class Code(object):
+    """
+    The bytecode of a function, or of the program itself: its instructions
+    in 'code', an array, and its constant pool. A frame has 'registers'
+    registers for the variables and intermediate values, the parameters
+    first, followed by one register for each constant, already holding it.
+    """
+
+    def __init__(self, name, params, matrices):
+        self.name = name
+        self.params = params
+        self.matrices = matrices
+        self.code = array.array('i')
+        self.constants = []
+        self.registers = 0
+        self.frame = None
+
+
+class BytecodeProgram(object):
+    """
+    The bytecode of a Trinity program: a Code for each function, in
+    'functions', and 'main', the one of the program.
+    """
+
+    def __init__(self, functions, main):
+        self.functions = functions
+        self.main = main
+
+    def execute(self, context=None):
+        from vm import VirtualMachine
+        VirtualMachine(self).run(context)
+
+
+class _Scope(object):
+    # Registers of the variables declared in a scope
+
+    def __init__(self, father=None, top=0):
+        self._father = father
+        self._registers = {}
+        self.top = top
+
+    def declare(self, name, register):
+        self._registers[name] = register
+
+    def lookup(self, name):
+        if name in self._registers:
+            return self._registers[name]
+        return self._father.lookup(name)
+
+
+class BytecodeCompiler(object):
+    """
+    Compiles a checked Trinity tree into bytecode. Each variable gets a
+    register of the frame of its function, reused once its block is left,
+    and intermediate values take the registers above them while a statement
+    is compiled. Evaluation order, copies of matrices and error reporting
+    follow Trinity.execute.
+    """
+
+    def __init__(self):
+        self._functions = {}
+        self._code = None
+        self._scope = None
+        self._top = 0
+        self._constants = None
+
+    def compileProgram(self, ast):
+        functions = []
+        for fun in ast._functions:
+            self._functions[fun.getName()] = len(functions)
+            functions.append(fun)
+        functions = [self._function(fun) for fun in functions]
+        self._begin(Code('main', 0, ()))
+        self._statements(ast._statements)
+        self._emit(RETN)
+        return BytecodeProgram(functions, self._end())
+
+    def _function(self, fun):
+        params = fun._params
+        matrices = tuple(i for i, param in enumerate(params) if type(param._type) is Matrix)
+        self._begin(Code(fun.getName(), len(params), matrices))
+        for param in params:
+            self._declare(param._name)
+        self._statements(fun._statements)
+        self._emit(RETN)
+        return self._end()
+
+    def _begin(self, code):
+        self._code = code
+        self._scope = _Scope()
+        self._top = 0
+        self._constants = {}
+        return code
+
+    def _end(self):
+        # The constants take the registers above the ones used, and the
+        # operands standing for them are given their numbers
+        code = self._code
+        pc = 0
+        while pc < len(code.code):
+            operands = _instructions[code.code[pc]][1]
+            for i, kind in enumerate(operands):
+                if kind == 'r' and code.code[pc + 1 + i] < 0:
+                    code.code[pc + 1 + i] = code.registers - 1 - code.code[pc + 1 + i]
+            pc += 1 + len(operands)
+        code.constants = [value for value, kind in code.constants]
+        code.frame = [None] * code.registers + code.constants
+        return code
+
+    def _emit(self, *instruction):
+        self._code.code.extend(instruction)
+
+    def _address(self):
+        return len(self._code.code)
+
+    def _patch(self, position, address):
+        self._code.code[position] = address
+
+    def _constant(self, value):
+        # Index in the constant pool of 'value'. 1 and True are not the
+        # same constant.
+        key = (value, type(value))
+        if key not in self._constants:
+            self._constants[key] = len(self._code.constants)
+            self._code.constants.append(key)
+        return self._constants[key]
+
+    def _constantRegister(self, value):
+        # Operand for the register holding the constant 'value', negative
+        # until the number of registers is known
+        return - 1 - self._constant(value)
+
+    def _temporary(self):
+        register = self._top
+        self._top += 1
+        if self._top > self._code.registers:
+            self._code.registers = self._top
+        return register
+
+    def _declare(self, name):
+        register = self._temporary()
+        self._scope.declare(name, register)
+        return register
+
+    def _enter(self):
+        self._scope = _Scope(self._scope, self._top)
+
+    def _leave(self):
+        self._top = self._scope.top
+        self._scope = self._scope._father
+
+    def _statements(self, statements):
+        if statements is None:
+            return
+        for statement in statements:
+            top = self._top
+            getattr(self, '_statement' + type(statement).__name__)(statement)
+            self._top = top
+
+    ############################################################################
+    # Statements
+
+    def _statementPrintStatement(self, node):
+        for printable in node._printables:
+            if type(printable) is StringLiteral:
+                self._emit(WRITE, self._constant(unescape(printable._value)))
+            else:
+                top = self._top
+                self._emit(PRINT, self._expression(printable))
+                self._top = top
+
+    def _statementReadStatement(self, node):
+        register = self._scope.lookup(node._variable._id)
+        if type(node._variable._type) is Number:
+            self._emit(READN, register)
+        else:
+            self._emit(READB, register)
+
+    def _statementAssignmentStatement(self, node):
+        lvalue = node._lvalue
+        if type(lvalue) is Variable:
+            self._assign(self._scope.lookup(lvalue._id), node._rvalue)
+            return
+        # The cell is found before the value is computed, as in execute()
+        matrix = self._scope.lookup(lvalue._matrix._id)
+        row, col = self._cell(lvalue)
+        self._emit(SET, matrix, row, col, self._expression(node._rvalue))
+
+    def _assign(self, register, rvalue):
+        # Matrices computed by the expression are new ones, only the value of
+        # a variable has to be copied
+        if type(rvalue) is Variable and type(rvalue._type) is Matrix:
+            self._emit(COPY, register, self._scope.lookup(rvalue._id))
+        else:
+            self._expression(rvalue, register)
+
+    def _statementReturnStatement(self, node):
+        self._emit(RET, self._expression(node._expression))
+
+    def _statementDiscardedExpression(self, node):
+        self._expression(node._expression)
+
+    def _statementIfStatement(self, node):
+        self._emit(JUMPF, self._expression(node._condition), 0)
+        jump = self._address() - 1
+        self._statements(node._statements)
+        if node._alt_statements is not None and node._alt_statements != []:
+            self._emit(JUMP, 0)
+            end = self._address() - 1
+            self._patch(jump, self._address())
+            self._statements(node._alt_statements)
+            self._patch(end, self._address())
+        else:
+            self._patch(jump, self._address())
+
+    def _statementForStatement(self, node):
+        matrix = self._expression(node._iterable)
+        if node._statements is None or node._statements == []:
+            return
+        iterator = self._temporary()
+        self._emit(ITER, iterator, matrix)
+        self._enter()
+        item = self._declare(node._item)
+        loop = self._address()
+        self._emit(NEXT, item, iterator, 0)
+        exit = self._address() - 1
+        self._statements(node._statements)
+        self._emit(JUMP, loop)
+        self._patch(exit, self._address())
+        self._leave()
+
+    def _statementWhileStatement(self, node):
+        if node._statements is None or node._statements == []:
+            # The condition is not even evaluated
+            return
+        loop = self._address()
+        top = self._top
+        self._emit(JUMPF, self._expression(node._condition), 0)
+        self._top = top
+        exit = self._address() - 1
+        self._statements(node._statements)
+        self._emit(JUMP, loop)
+        self._patch(exit, self._address())
+
+    def _statementBlockStatement(self, node):
+        self._enter()
+        for declaration in node._declared_vars:
+            getattr(self, '_statement' + type(declaration).__name__)(declaration)
+        self._statements(node._statements)
+        self._leave()
+
+    def _statementVariableDeclaration(self, node):
+        register = self._declare(node._id)
+        data_type = node._type
+        if type(data_type) is Matrix:
+            self._emit(ZEROS, register, data_type.rows, data_type.cols)
+        else:
+            self._emit(MOVE, register, self._constantRegister(data_type.initialValue()))
+        return register
+
+    def _statementVariableDeclarationAssign(self, node):
+        # The name is declared before its value is computed, as in execute()
+        register = self._statementVariableDeclaration(node)
+        top = self._top
+        self._assign(register, node._rvalue)
+        self._top = top
+
+    ############################################################################
+    # Expressions
+
+    def _expression(self, node, target=None):
+        """
+        Compiles the expression 'node', and returns the register with its
+        value: 'target', if given, or a new one unless the value is already
+        held in a register.
+        """
+        return getattr(self, '_expression' + type(node).__name__)(node, target)
+
+    def _move(self, register, target):
+        if target is None or target == register:
+            return register
+        self._emit(MOVE, target, register)
+        return target
+
+    def _result(self, top, target):
+        # Register for the result of an operation, once its operands, from
+        # 'top' on, are computed
+        self._top = top
+        if target is None:
+            return self._temporary()
+        return target
+
+    def _literal(self, node, target):
+        return self._move(self._constantRegister(node._value), target)
+
+    _expressionStringLiteral = _literal
+
+    def _expressionTrueLiteral(self, node, target):
+        return self._move(self._constantRegister(True), target)
+
+    def _expressionFalseLiteral(self, node, target):
+        return self._move(self._constantRegister(False), target)
+
+    def _expressionNumberLiteral(self, node, target):
+        return self._move(self._constantRegister(node._number), target)
+
+    def _expressionMatrixLiteral(self, node, target):
+        top = self._top
+        rows, cols = len(node._matrix), len(node._matrix[0])
+        first = self._top
+        for i in xrange(rows * cols):
+            self._temporary()
+        for i, row in enumerate(node._matrix):
+            for j, elem in enumerate(row):
+                self._expression(elem, first + i * cols + j)
+        register = self._result(top, target)
+        self._emit(MATRIX, register, rows, cols, first)
+        return register
+
+    def _expressionVariable(self, node, target):
+        return self._move(self._scope.lookup(node._id), target)
+
+    def _expressionProjectedMatrix(self, node, target):
+        top = self._top
+        matrix = self._expression(node._matrix)
+        position = self._constant(node._position)
+        if node._component is None:
+            row = self._expression(node._row)
+            col = self._expression(node._col)
+            register = self._result(top, target)
+            self._emit(PROJM, register, matrix, row, col, position)
+        else:
+            component = self._expression(node._component)
+            register = self._result(top, target)
+            self._emit(PROJV, register, matrix, component, position)
+        return register
+
+    _expressionProjectedVector = _expressionProjectedMatrix
+
+    def _index(self, expression, size, position):
+        register = self._expression(expression)
+        index = self._temporary()
+        self._emit(IDX, index, register, size, self._constant(position))
+        return index
+
+    def _cell(self, node):
+        # Registers with the row and column, from 0, projected by a
+        # ProjectedVariable
+        type_class = node._matrix._type
+        if node._component is None:
+            return (self._index(node._row, type_class.rows, node._position),
+                    self._index(node._col, type_class.cols, node._position))
+        elif type_class.rows == 1:
+            return (self._constantRegister(0),
+                    self._index(node._component, type_class.cols, node._position))
+        return (self._index(node._component, type_class.rows, node._position),
+                self._constantRegister(0))
+
+    def _expressionProjectedVariable(self, node, target):
+        top = self._top
+        matrix = self._scope.lookup(node._matrix._id)
+        row, col = self._cell(node)
+        register = self._result(top, target)
+        self._emit(GET, register, matrix, row, col)
+        return register
+
+    def _expressionFunctionCall(self, node, target):
+        top = self._top
+        first = self._top
+        for arg in node._arguments:
+            self._temporary()
+        for i, arg in enumerate(node._arguments):
+            self._expression(arg, first + i)
+        register = self._result(top, target)
+        self._emit(CALL, register, self._functions[node._id], first, len(node._arguments))
+        return register
+
+    def _binary(self, node, target):
+        top = self._top
+        left = self._expression(node._left)
+        right = self._expression(node._right)
+        register = self._result(top, target)
+        if type(node._left._type) is Matrix and type(node) in _matrices:
+            self._emit(_matrices[type(node)], register, left, right)
+        elif type(node) in (Division, Modulus, RealDivision, RealModulus):
+            self._emit(_numbers[type(node)], register, left, right,
+                       self._constant(node._right._position))
+        else:
+            self._emit(_numbers[type(node)], register, left, right)
+        return register
+
+    _expressionSum = _binary
+    _expressionSubtraction = _binary
+    _expressionTimes = _binary
+    _expressionDivision = _binary
+    _expressionModulus = _binary
+    _expressionRealDivision = _binary
+    _expressionRealModulus = _binary
+    _expressionEquivalence = _binary
+    _expressionNotEquivalence = _binary
+    _expressionGreaterOrEqual = _binary
+    _expressionLessOrEqual = _binary
+    _expressionGreater = _binary
+    _expressionLess = _binary
+    _expressionAnd = _binary
+    _expressionOr = _binary
+
+    def _scalar(self, node, target):
+        top = self._top
+        operation = self._constant(_scalars[type(node)])
+        position = self._constant(node._right._position)
+        if type(node._left._type) is Matrix:
+            matrix = self._expression(node._left)
+            scalar = self._expression(node._right)
+            register = self._result(top, target)
+            self._emit(MAP, register, matrix, scalar, operation, position)
+        else:
+            # The matrix is computed first, as in execute()
+            matrix = self._expression(node._right)
+            scalar = self._expression(node._left)
+            register = self._result(top, target)
+            self._emit(RMAP, register, matrix, scalar, operation, position)
+        return register
+
+    _expressionMatrixSum = _scalar
+    _expressionMatrixSubtraction = _scalar
+    _expressionMatrixTimes = _scalar
+    _expressionMatrixDivision = _scalar
+    _expressionMatrixModulus = _scalar
+    _expressionMatrixRealDivision = _scalar
+    _expressionMatrixRealModulus = _scalar
+
+    def _unary(self, node, target, opcode):
+        top = self._top
+        operand = self._expression(node._operand)
+        register = self._result(top, target)
+        self._emit(opcode, register, operand)
+        return register
+
+    def _expressionUnaryMinus(self, node, target):
+        if type(node._operand._type) is Matrix:
+            return self._unary(node, target, MNEG)
+        return self._unary(node, target, NEG)
+
+    def _expressionTranspose(self, node, target):
+        return self._unary(node, target, TRANS)
+
+    def _expressionNot(self, node, target):
+        return self._unary(node, target, NOT)
+
+
+def compileProgram(ast):
+    """
+    Returns the BytecodeProgram of 'ast', a tree already checked.
+    """
+    return BytecodeCompiler().compileProgram(ast)
+
+def disassemble(program):
+    """
+    Returns the listing of the bytecode of 'program', a BytecodeProgram.
+    """
+    lines = []
+    for index, code in enumerate(program.functions + [program.main]):
+        lines.append("%s: %d parameters, %d registers" % (code.name, code.params, code.registers))
+        for i, constant in enumerate(code.constants):
+            lines.append("    k%d = %r" % (i, constant))
+        pc = 0
+        while pc < len(code.code):
+            name, operands = _instructions[code.code[pc]]
+            arguments = []
+            for kind, value in zip(operands, code.code[pc + 1:pc + 1 + len(operands)]):
+                if kind == 'r' and value >= code.registers:
+                    arguments.append("k%d" % (value - code.registers))
+                elif kind == 'r':
+                    arguments.append("r%d" % value)
+                elif kind == 'k':
+                    arguments.append("#%d" % value)
+                elif kind == 'f':
+                    arguments.append(program.functions[value].name)
+                else:
+                    arguments.append(str(value))
+            lines.append("    %4d  %-6s %s" % (pc, name, ", ".join(arguments)))
+            pc += 1 + len(operands)
+        lines.append("")
+    return "\n".join(lines)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# cache.py
+#
+# Cache on disk of checked Trinity programs
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+import cPickle
+import errno
+import hashlib
+import os
+import tempfile
+
+import lang
+
+# Modules whose changes may change the tree built and checked for a program
+_front_end = ('lexical_specs.py', 'syntactic_specs.py', 'pratt.py', 'ast.py', 'sym_table.py')
+
+def interpreterVersion():
+    """
+    Returns the version of the interpreter along with a hash of the sources
+    of its front end, so that a cached program is not used after they are
+    edited, even if the version is not changed.
+    """
+    digest = hashlib.sha1()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in _front_end:
+        source = open(os.path.join(directory, name), 'rb')
+        try:
+            digest.update(source.read())
+        finally:
+            source.close()
+    return "%s-%s" % (lang.__version__, digest.hexdigest())
+
+
+class ProgramCache(object):
+    """
+    Keeps in 'directory' the tree of each program that was parsed and
+    checked without errors, pickled. An entry is found by a hash of the
+    program and of the version of the interpreter.
+    """
+
+    def __init__(self, directory):
+        self._directory = directory
+        self._version = interpreterVersion()
+        self._last = (None, None)
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    def key(self, source):
+        digest = hashlib.sha1()
+        digest.update("%s\n" % self._version)
+        digest.update(source)
+        return digest.hexdigest()
+
+    def _filename(self, source):
+        # A store usually follows a failed load of the same program, so its
+        # hash is kept not to compute it twice. Both are replaced at once, so
+        # threads sharing the cache never pair a program with another's hash
+        last_source, last_key = self._last
+        if last_source is not source:
+            last_key = self.key(source)
+            self._last = (source, last_key)
+        return os.path.join(self._directory, last_key + '.ast')
+
+    def load(self, source):
+        """
+        Returns the checked tree cached for 'source', or None if there is
+        none.
+        """
+        try:
+            entry = open(self._filename(source), 'rb')
+        except IOError:
+            return None
+        try:
+            try:
+                return cPickle.load(entry)
+            finally:
+                entry.close()
+        except (EOFError, cPickle.UnpicklingError, AttributeError, ImportError, ValueError):
+            return None
+
+    def store(self, source, ast):
+        """
+        Writes 'ast', the checked tree of 'source', to the cache. The entry
+        is written aside and then renamed, so a concurrent load never reads
+        half of it.
+        """
+        descriptor, temporary = tempfile.mkstemp(dir=self._directory)
+        try:
+            entry = os.fdopen(descriptor, 'wb')
+            try:
+                cPickle.dump(ast, entry, cPickle.HIGHEST_PROTOCOL)
+            finally:
+                entry.close()
+            os.rename(temporary, self._filename(source))
+        except RuntimeError:
+            # Trees too deep to be pickled are just not cached
+            os.remove(temporary)
+        except:
+            os.remove(temporary)
+            raise
@@ -0,0 +1,581 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# closures.py
+#
+# Execution engine that compiles a checked Trinity tree into
+# nested Python closures
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+from ast import *
+from sym_table import Boolean, Number, Matrix
+from exceptions import TrinityZeroDivisionError
+from context import Context
+
+import re
+
+# Every closure takes the frame of the running function, or of the program,
+# a list whose slots hold the variables of all of its scopes. The first one
+# holds the Context of the run.
+CONTEXT = 0
+
+_number_pattern = re.compile('[-]?([0-9]+)(\.[0-9]+)?')
+_boolean_pattern = re.compile('(True|False)')
+
+def unescape(string):
+    """
+    Returns 'string' as the print statement writes it, with its escape
+    sequences replaced. Unknown escape sequences are dropped.
+    """
+    escapes = {'a': '\a', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r',
+               't': '\t', 'v': '\v', '\\': '\\', '"': '"'}
+    result = []
+    scaped = False
+    for char in string:
+        if not scaped:
+            if char == '\\':
+                scaped = True
+            else:
+                result.append(char)
+        else:
+            result.append(escapes.get(char, ''))
+            scaped = False
+    return ''.join(result)
+
+def formatValue(value):
+    """
+    Returns 'value', other than a string, as the print statement writes it.
+    """
+    if isinstance(value, list):
+        string = "{"
+        for row in value:
+            for elem in row:
+                string += " " + str(elem) + ","
+            string += ":"
+        return string + "}"
+    elif value is True:
+        return 'True'
+    elif value is False:
+        return 'False'
+    return str(value)
+
+def zeroDivision(position):
+    error = "In line %d, column %d, " % position
+    error += "trying to compute a zero division."
+    return TrinityZeroDivisionError(error)
+
+
+class _Scope(object):
+    # Names declared in a scope, and the slots of the frame they live in
+
+    def __init__(self, father=None):
+        self._father = father
+        self._slots = {}
+
+    def declare(self, name, slot):
+        self._slots[name] = slot
+
+    def lookup(self, name):
+        if name in self._slots:
+            return self._slots[name]
+        if self._father is not None:
+            return self._father.lookup(name)
+        return None
+
+
+class _Function(object):
+    # A compiled function: the closures of its body and the size of its frame
+
+    def __init__(self, definition):
+        self.definition = definition
+        self.body = None
+        self.size = None
+
+
+class CompiledProgram(object):
+    """
+    A Trinity program compiled into closures. It can be run many times, each
+    one with its own Context.
+    """
+
+    def __init__(self, body, size):
+        self._body = body
+        self._size = size
+
+    def execute(self, context=None):
+        if context is None:
+            context = Context()
+        frame = [None] * self._size
+        frame[CONTEXT] = context
+        for statement in self._body:
+            statement(frame)
+
+
+class ClosureCompiler(object):
+    """
+    Turns a checked Trinity tree into closures. Each operation is specialized
+    on the types found by check(), and each variable is bound to a slot of
+    the frame of its function, so running the program neither walks the tree
+    nor looks names up. The output is the one of Trinity.execute.
+    """
+
+    def __init__(self):
+        self._functions = {}
+        self._scope = None
+        self._size = None
+
+    def compileProgram(self, ast):
+        for fun in ast._functions:
+            self._functions[fun.getName()] = _Function(fun)
+        for fun in ast._functions:
+            self._compileFunction(self._functions[fun.getName()])
+        self._size = CONTEXT + 1
+        self._scope = _Scope()
+        body = self._statements(ast._statements)
+        return CompiledProgram(body, self._size)
+
+    def _compileFunction(self, function):
+        definition = function.definition
+        self._size = CONTEXT + 1
+        self._scope = _Scope()
+        for param in definition._params:
+            self._declare(param._name)
+        function.body = self._statements(definition._statements)
+        function.size = self._size
+
+    def _declare(self, name):
+        slot = self._size
+        self._size += 1
+        self._scope.declare(name, slot)
+        return slot
+
+    def _enter(self):
+        self._scope = _Scope(self._scope)
+
+    def _leave(self):
+        self._scope = self._scope._father
+
+    def _compile(self, node):
+        return getattr(self, '_compile' + type(node).__name__)(node)
+
+    def _statements(self, statements):
+        if statements is None:
+            return []
+        return [self._compile(statement) for statement in statements]
+
+    def _block(self, statements):
+        # A sequence of statements run as one closure
+        if len(statements) == 1:
+            return statements[0]
+        statements = tuple(statements)
+        def block(frame):
+            for statement in statements:
+                statement(frame)
+        return block
+
+    ############################################################################
+    # Statements
+
+    def _compilePrintStatement(self, node):
+        writers = []
+        for printable in node._printables:
+            if type(printable) is StringLiteral:
+                writers.append(self._constantWriter(unescape(printable._value)))
+            else:
+                writers.append(self._valueWriter(self._compile(printable)))
+        return self._block(writers)
+
+    def _constantWriter(self, string):
+        def write(frame):
+            frame[CONTEXT].write(string)
+        return write
+
+    def _valueWriter(self, expression):
+        def write(frame):
+            value = expression(frame)
+            frame[CONTEXT].write(formatValue(value))
+        return write
+
+    def _compileReadStatement(self, node):
+        slot = self._scope.lookup(node._variable._id)
+        if type(node._variable._type) is Number:
+            def read(frame):
+                ret = _number_pattern.match(frame[CONTEXT].readLine())
+                if ret is not None:
+                    value = ret.group()
+                    frame[slot] = float(value) if '.' in value else int(value)
+        else:
+            def read(frame):
+                ret = _boolean_pattern.match(frame[CONTEXT].readLine())
+                if ret is not None:
+                    frame[slot] = ret.group() == 'True'
+        return read
+
+    def _compileAssignmentStatement(self, node):
+        lvalue = node._lvalue
+        rvalue = self._compile(node._rvalue)
+        slot = self._scope.lookup(lvalue._id if type(lvalue) is Variable else lvalue._matrix._id)
+        if type(lvalue) is Variable:
+            if type(node._rvalue._type) is Matrix:
+                def assign(frame):
+                    frame[slot] = copyValue(rvalue(frame))
+            else:
+                def assign(frame):
+                    frame[slot] = rvalue(frame)
+            return assign
+        cell = self._cell(lvalue)
+        def assign(frame):
+            matrix = frame[slot]
+            row, col = cell(frame)
+            matrix[row][col] = rvalue(frame)
+        return assign
+
+    def _compileReturnStatement(self, node):
+        expression = self._compile(node._expression)
+        def return_(frame):
+            raise FunctionReturn(expression(frame))
+        return return_
+
+    def _compileDiscardedExpression(self, node):
+        return self._compile(node._expression)
+
+    def _compileIfStatement(self, node):
+        condition = self._compile(node._condition)
+        statements = self._block(self._statements(node._statements))
+        if node._alt_statements is not None and node._alt_statements != []:
+            alternative = self._block(self._statements(node._alt_statements))
+            def if_(frame):
+                if condition(frame):
+                    statements(frame)
+                else:
+                    alternative(frame)
+        else:
+            def if_(frame):
+                if condition(frame):
+                    statements(frame)
+        return if_
+
+    def _compileForStatement(self, node):
+        iterable = self._compile(node._iterable)
+        self._enter()
+        slot = self._declare(node._item)
+        statements = self._statements(node._statements)
+        self._leave()
+        if statements == []:
+            return iterable
+        body = self._block(statements)
+        def for_(frame):
+            for row in iterable(frame):
+                for elem in row:
+                    frame[slot] = elem
+                    body(frame)
+        return for_
+
+    def _compileWhileStatement(self, node):
+        if node._statements is None or node._statements == []:
+            # The condition is not even evaluated
+            return lambda frame: None
+        condition = self._compile(node._condition)
+        body = self._block(self._statements(node._statements))
+        def while_(frame):
+            while condition(frame):
+                body(frame)
+        return while_
+
+    def _compileBlockStatement(self, node):
+        self._enter()
+        statements = self._statements(node._declared_vars)
+        statements += self._statements(node._statements)
+        self._leave()
+        if statements == []:
+            return lambda frame: None
+        return self._block(statements)
+
+    def _compileVariableDeclaration(self, node):
+        slot = self._declare(node._id)
+        data_type = node._type
+        if type(data_type) is Matrix:
+            rows, cols = data_type.rows, data_type.cols
+            def declare(frame):
+                frame[slot] = Matrix.zeros(rows, cols)
+        else:
+            value = data_type.initialValue()
+            def declare(frame):
+                frame[slot] = value
+        return declare
+
+    def _compileVariableDeclarationAssign(self, node):
+        declare = self._compileVariableDeclaration(node)
+        # The name is declared before its value is computed, as in execute()
+        rvalue = self._compile(node._rvalue)
+        slot = self._scope.lookup(node._id)
+        if type(node._type) is Matrix:
+            def assign(frame):
+                declare(frame)
+                frame[slot] = copyValue(rvalue(frame))
+        else:
+            def assign(frame):
+                declare(frame)
+                frame[slot] = rvalue(frame)
+        return assign
+
+    ############################################################################
+    # Expressions
+
+    def _compileStringLiteral(self, node):
+        value = node._value
+        return lambda frame: value
+
+    def _compileTrueLiteral(self, node):
+        return lambda frame: True
+
+    def _compileFalseLiteral(self, node):
+        return lambda frame: False
+
+    def _compileNumberLiteral(self, node):
+        value = node._number
+        return lambda frame: value
+
+    def _compileMatrixLiteral(self, node):
+        rows = tuple(tuple(self._compile(elem) for elem in row) for row in node._matrix)
+        def matrix(frame):
+            return [[elem(frame) for elem in row] for row in rows]
+        return matrix
+
+    def _compileVariable(self, node):
+        slot = self._scope.lookup(node._id)
+        return lambda frame: frame[slot]
+
+    def _compileProjectedMatrix(self, node):
+        matrix = self._compile(node._matrix)
+        position = node._position
+        if node._component is None:
+            row = self._compile(node._row)
+            col = self._compile(node._col)
+            def project(frame):
+                m = matrix(frame)
+                i = projectionIndex(row(frame), len(m), position)
+                j = projectionIndex(col(frame), len(m[0]), position)
+                return m[i][j]
+        else:
+            component = self._compile(node._component)
+            def project(frame):
+                m = matrix(frame)
+                if len(m) == 1:
+                    return m[0][projectionIndex(component(frame), len(m[0]), position)]
+                return m[projectionIndex(component(frame), len(m), position)][0]
+        return project
+
+    _compileProjectedVector = _compileProjectedMatrix
+
+    def _cell(self, node):
+        # The closure computing the row and column projected by a
+        # ProjectedVariable, from 0
+        type_class = node._matrix._type
+        rows, cols = type_class.rows, type_class.cols
+        position = node._position
+        if node._component is None:
+            row = self._compile(node._row)
+            col = self._compile(node._col)
+            def cell(frame):
+                i = projectionIndex(row(frame), rows, position)
+                return (i, projectionIndex(col(frame), cols, position))
+        elif rows == 1:
+            component = self._compile(node._component)
+            def cell(frame):
+                return (0, projectionIndex(component(frame), cols, position))
+        else:
+            component = self._compile(node._component)
+            def cell(frame):
+                return (projectionIndex(component(frame), rows, position), 0)
+        return cell
+
+    def _compileProjectedVariable(self, node):
+        slot = self._scope.lookup(node._matrix._id)
+        cell = self._cell(node)
+        def project(frame):
+            matrix = frame[slot]
+            row, col = cell(frame)
+            return matrix[row][col]
+        return project
+
+    def _compileFunctionCall(self, node):
+        function = self._functions[node._id]
+        arguments = tuple(self._compile(arg) for arg in node._arguments)
+        def call(frame):
+            values = [argument(frame) for argument in arguments]
+            callee = [None] * function.size
+            callee[CONTEXT] = frame[CONTEXT]
+            slot = CONTEXT + 1
+            for value in values:
+                callee[slot] = copyValue(value)
+                slot += 1
+            try:
+                for statement in function.body:
+                    statement(callee)
+            except FunctionReturn as ret:
+                return ret.value
+            return None
+        return call
+
+    def _binary(self, node):
+        return (self._compile(node._left), self._compile(node._right))
+
+    def _compileSum(self, node):
+        left, right = self._binary(node)
+        if type(node._left._type) is Matrix:
+            def sum_(frame):
+                e1 = left(frame)
+                e2 = right(frame)
+                return [[a + b for a, b in zip(r1, r2)] for r1, r2 in zip(e1, e2)]
+            return sum_
+        return lambda frame: left(frame) + right(frame)
+
+    def _compileSubtraction(self, node):
+        left, right = self._binary(node)
+        if type(node._left._type) is Matrix:
+            def subtraction(frame):
+                e1 = left(frame)
+                e2 = right(frame)
+                return [[a - b for a, b in zip(r1, r2)] for r1, r2 in zip(e1, e2)]
+            return subtraction
+        return lambda frame: left(frame) - right(frame)
+
+    def _compileTimes(self, node):
+        left, right = self._binary(node)
+        if type(node._left._type) is Matrix:
+            def times(frame):
+                e1 = left(frame)
+                return Times.matrix_multiply(e1, right(frame))
+            return times
+        return lambda frame: left(frame) * right(frame)
+
+    def _division(self, node, operation):
+        left, right = self._binary(node)
+        position = node._right._position
+        def division(frame):
+            e1 = left(frame)
+            e2 = right(frame)
+            try:
+                return operation(e1, e2)
+            except ZeroDivisionError:
+                raise zeroDivision(position)
+        return division
+
+    def _compileDivision(self, node):
+        return self._division(node, lambda a, b: a // b)
+
+    def _compileModulus(self, node):
+        return self._division(node, lambda a, b: a % b)
+
+    def _compileRealDivision(self, node):
+        return self._division(node, lambda a, b: a / b)
+
+    _compileRealModulus = _compileModulus
+
+    def _scalar(self, node, operation):
+        # An operation between a matrix and a number, element by element.
+        # The matrix is computed first, as in execute()
+        left, right = self._binary(node)
+        position = node._right._position
+        if type(node._left._type) is Matrix:
+            def scalar(frame):
+                matrix = left(frame)
+                number = right(frame)
+                try:
+                    return [[operation(y, number) for y in row] for row in matrix]
+                except ZeroDivisionError:
+                    raise zeroDivision(position)
+        else:
+            def scalar(frame):
+                matrix = right(frame)
+                number = left(frame)
+                try:
+                    return [[operation(number, y) for y in row] for row in matrix]
+                except ZeroDivisionError:
+                    raise zeroDivision(position)
+        return scalar
+
+    def _compileMatrixSum(self, node):
+        return self._scalar(node, lambda a, b: a + b)
+
+    def _compileMatrixSubtraction(self, node):
+        return self._scalar(node, lambda a, b: a - b)
+
+    def _compileMatrixTimes(self, node):
+        return self._scalar(node, lambda a, b: a * b)
+
+    def _compileMatrixDivision(self, node):
+        return self._scalar(node, lambda a, b: a // b)
+
+    def _compileMatrixModulus(self, node):
+        return self._scalar(node, lambda a, b: a % b)
+
+    def _compileMatrixRealDivision(self, node):
+        return self._scalar(node, lambda a, b: a / b)
+
+    _compileMatrixRealModulus = _compileMatrixModulus
+
+    def _compileEquivalence(self, node):
+        left, right = self._binary(node)
+        return lambda frame: left(frame) == right(frame)
+
+    def _compileNotEquivalence(self, node):
+        left, right = self._binary(node)
+        return lambda frame: left(frame) != right(frame)
+
+    def _compileGreaterOrEqual(self, node):
+        left, right = self._binary(node)
+        return lambda frame: left(frame) >= right(frame)
+
+    def _compileLessOrEqual(self, node):
+        left, right = self._binary(node)
+        return lambda frame: left(frame) <= right(frame)
+
+    def _compileGreater(self, node):
+        left, right = self._binary(node)
+        return lambda frame: left(frame) > right(frame)
+
+    def _compileLess(self, node):
+        left, right = self._binary(node)
+        return lambda frame: left(frame) < right(frame)
+
+    def _compileAnd(self, node):
+        # Both operands are always computed
+        left, right = self._binary(node)
+        def and_(frame):
+            e1 = left(frame)
+            e2 = right(frame)
+            return e1 and e2
+        return and_
+
+    def _compileOr(self, node):
+        left, right = self._binary(node)
+        def or_(frame):
+            e1 = left(frame)
+            e2 = right(frame)
+            return e1 or e2
+        return or_
+
+    def _compileUnaryMinus(self, node):
+        operand = self._compile(node._operand)
+        if type(node._operand._type) is Matrix:
+            return lambda frame: [[- y for y in row] for row in operand(frame)]
+        return lambda frame: - operand(frame)
+
+    def _compileTranspose(self, node):
+        operand = self._compile(node._operand)
+        return lambda frame: [list(col) for col in zip(*operand(frame))]
+
+    def _compileNot(self, node):
+        operand = self._compile(node._operand)
+        return lambda frame: not operand(frame)
+
+
+def compileProgram(ast):
+    """
+    Returns the CompiledProgram of 'ast', a tree already checked.
+    """
+    return ClosureCompiler().compileProgram(ast)
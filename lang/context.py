@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# context.py
+#
+# Standard streams of a run of a Trinity program
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+import sys
+
+
+class Context(object):
+    """
+    The streams a program writes its output to and reads its input from.
+    Each run has its own, so programs can run at the same time in threads
+    of one process. By default, the standard streams of the process at the
+    moment the context is created are used.
+    """
+
+    def __init__(self, output=None, input=None):
+        self._output = output if output is not None else sys.stdout
+        self._input = input if input is not None else sys.stdin
+
+    def getOutput(self):
+        return self._output
+
+    def getInput(self):
+        return self._input
+
+    def write(self, string):
+        self._output.write(string)
+
+    def readLine(self):
+        """
+        Returns the next line of the input without its newline, as
+        raw_input does, raising EOFError at the end of the input. The output
+        is flushed first, so what was printed is seen before the program
+        waits.
+        """
+        self._output.flush()
+        line = self._input.readline()
+        if line == '':
+            raise EOFError("EOF when reading a line")
+        if line.endswith('\n'):
+            line = line[:-1]
+        return line
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# forkserver.py
+#
+# Runs Trinity programs concurrently, each one in a process
+# forked from one that has the interpreter already loaded
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+from interpreter import Interpreter, UNCAUGHT_EXCEPTION
+
+import errno
+import multiprocessing
+import os
+import resource
+import select
+import signal
+import sys
+import time
+import traceback
+
+class Job(object):
+    """
+    A program to be run by a ForkServer: the file 'program', or the given
+    'source', with 'input' as its standard input. Once run, it has the exit
+    status, standard output and standard error of the program. A program
+    killed by a signal has 128 plus the number of the signal as its status,
+    as in the shell.
+    """
+
+    def __init__(self, program, input='', source=None):
+        self._program = program
+        self._input = input
+        self._source = source
+        self._status = None
+        self._output = None
+        self._errors = None
+        self._timed_out = False
+
+    def getProgram(self):
+        return self._program
+
+    def getInput(self):
+        return self._input
+
+    def getSource(self):
+        return self._source
+
+    def getStatus(self):
+        return self._status
+
+    def getOutput(self):
+        return self._output
+
+    def getErrors(self):
+        return self._errors
+
+    def timedOut(self):
+        return self._timed_out
+
+    def finish(self, status, output, errors, timed_out):
+        self._status = status
+        self._output = output
+        self._errors = errors
+        self._timed_out = timed_out
+
+
+class _Running(object):
+    # The state of a job while its process runs
+
+    def __init__(self, job, pid, stdin, stdout, stderr, deadline):
+        self.job = job
+        self.pid = pid
+        self.stdin = stdin
+        self.pending = job.getInput()
+        self.streams = {stdout: [], stderr: []}
+        self.output = self.streams[stdout]
+        self.errors = self.streams[stderr]
+        self.deadline = deadline
+        self.timed_out = False
+
+    def descriptors(self):
+        if self.stdin is not None:
+            return [self.stdin] + self.streams.keys()
+        return self.streams.keys()
+
+
+class ForkServer(object):
+    """
+    Runs jobs, at most 'workers' at a time (as many as processors by
+    default). The interpreter is loaded and the parser built once, in this
+    process, and a process is forked from it for every job, with pipes for
+    its standard streams, so programs do not share any state. A job running
+    for more than 'timeout' seconds is killed, and a program can not use
+    more than 'memory_limit' bytes of memory. 'options' are given to the
+    Interpreter.
+    """
+
+    def __init__(self, workers=None, timeout=None, memory_limit=None, **options):
+        self._workers = workers if workers is not None else multiprocessing.cpu_count()
+        self._timeout = timeout
+        self._memory_limit = memory_limit
+        self._interpreter = Interpreter(**options)
+        self._interpreter.getParser()
+        self._running = []
+
+    def run(self, jobs):
+        """
+        Runs 'jobs', and returns them once they are all finished.
+        """
+        pending = list(reversed(jobs))
+        while len(pending) > 0 or len(self._running) > 0:
+            while len(pending) > 0 and len(self._running) < self._workers:
+                self._start(pending.pop())
+            self._poll()
+        return jobs
+
+    def _start(self, job):
+        stdin = os.pipe()
+        stdout = os.pipe()
+        stderr = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(stdin[1])
+            os.close(stdout[0])
+            os.close(stderr[0])
+            self._child(job, stdin[0], stdout[1], stderr[1])
+        os.close(stdin[0])
+        os.close(stdout[1])
+        os.close(stderr[1])
+        deadline = None
+        if self._timeout is not None:
+            deadline = time.time() + self._timeout
+        self._running += [_Running(job, pid, stdin[1], stdout[0], stderr[0], deadline)]
+
+    def _child(self, job, stdin, stdout, stderr):
+        # Never returns: the process exits with the status of the program
+        status = UNCAUGHT_EXCEPTION
+        try:
+            for running in self._running:
+                for descriptor in running.descriptors():
+                    os.close(descriptor)
+            os.dup2(stdin, 0)
+            os.dup2(stdout, 1)
+            os.dup2(stderr, 2)
+            for descriptor in (stdin, stdout, stderr):
+                os.close(descriptor)
+            sys.stdin = os.fdopen(0, 'r')
+            sys.stdout = os.fdopen(1, 'w')
+            sys.stderr = os.fdopen(2, 'w', 0)
+            if self._memory_limit is not None:
+                resource.setrlimit(resource.RLIMIT_AS, (self._memory_limit, self._memory_limit))
+            try:
+                if job.getSource() is not None:
+                    status = self._interpreter.run(job.getSource())
+                else:
+                    status = self._interpreter.runFile(job.getProgram())
+            except Exception:
+                traceback.print_exc()
+                status = UNCAUGHT_EXCEPTION
+            sys.stdout.flush()
+        finally:
+            os._exit(status)
+
+    def _poll(self):
+        readable = []
+        writable = []
+        deadlines = []
+        for running in self._running:
+            readable += running.streams.keys()
+            if running.stdin is not None:
+                writable += [running.stdin]
+            if running.deadline is not None and not running.timed_out:
+                deadlines += [running.deadline]
+        timeout = None
+        if len(deadlines) > 0:
+            timeout = max(0, min(deadlines) - time.time())
+        try:
+            readable, writable, _ = select.select(readable, writable, [], timeout)
+        except select.error as e:
+            if e.args[0] != errno.EINTR:
+                raise
+            return
+
+        for running in list(self._running):
+            if running.stdin in writable:
+                self._feed(running)
+            for descriptor in running.streams.keys():
+                if descriptor in readable:
+                    self._read(running, descriptor)
+            if (running.deadline is not None and not running.timed_out
+                    and time.time() >= running.deadline):
+                os.kill(running.pid, signal.SIGKILL)
+                running.timed_out = True
+            if running.stdin is None and len(running.streams) == 0:
+                self._finish(running)
+
+    def _feed(self, running):
+        try:
+            written = os.write(running.stdin, running.pending[:select.PIPE_BUF])
+            running.pending = running.pending[written:]
+        except OSError as e:
+            if e.errno != errno.EPIPE:
+                raise
+            # The program exited without reading all of its input
+            running.pending = ''
+        if len(running.pending) == 0:
+            os.close(running.stdin)
+            running.stdin = None
+
+    def _read(self, running, descriptor):
+        data = os.read(descriptor, 65536)
+        if len(data) > 0:
+            running.streams[descriptor] += [data]
+        else:
+            os.close(descriptor)
+            del running.streams[descriptor]
+
+    def _finish(self, running):
+        _, status = os.waitpid(running.pid, 0)
+        if os.WIFSIGNALED(status):
+            status = 128 + os.WTERMSIG(status)
+        else:
+            status = os.WEXITSTATUS(status)
+        running.job.finish(status, ''.join(running.output), ''.join(running.errors), running.timed_out)
+        self._running.remove(running)
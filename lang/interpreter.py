@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# interpreter.py
+#
+# Runs Trinity programs, as the trinity command does, reusing
+# the parser and caches from one program to the next
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+from lexer.lexer import Lexer
+from lexer.cache import TokenCache
+from lexer.exceptions import LexicographicalError
+
+import lexical_specs
+from parsing import buildParser
+from cache import ProgramCache
+from context import Context
+import closures
+import pygen
+import bytecode
+from exceptions import (
+    TrinitySyntaxError,
+    TrinityScopeError,
+    TrinityTypeError,
+    TrinityMatrixDimensionError,
+    TrinityZeroDivisionError,
+    TrinityMatrixDimensionAccessError
+    )
+
+import mmap
+import threading
+
+try:
+    import lextab
+except ImportError:
+    lextab = None
+
+SUCCESS = 0
+ERR_BAD_USAGE = 1
+ERR_BAD_FILENAME = 2
+ERR_IO_ERROR = 3
+ERR_LEXICOGRAPHICAL_ERROR = 4
+ERR_SYNTAX_ERROR = 5
+ERR_SCOPE_ERROR = 6
+ERR_TYPE_ERROR = 7
+ERR_MATRIX_DIM_ERROR = 8
+ERR_ZERO_DIVISION = 0
+ERR_MATRIX_DIM_ACCESS_ERROR = 0
+
+# Exit status of python when an exception is not caught
+UNCAUGHT_EXCEPTION = 1
+
+class Interpreter(object):
+    """
+    Lexes, parses, checks and executes Trinity programs. The parser is built
+    the first time it is needed and kept for the programs that follow.
+
+    Errors in a program are printed to its output, and the exit status the
+    trinity command has for them is returned. The output and input of each
+    run are given in a Context, the standard streams by default, and each
+    thread has a parser of its own, so programs can be run concurrently in
+    threads sharing one Interpreter.
+
+    Programs are run walking their tree, with the 'tree' engine, once
+    compiled into closures, with the 'closures' engine, translated into
+    Python, with the 'python' engine, or compiled into bytecode for the
+    virtual machine, with the 'vm' engine. The Python source, or the listing
+    of the bytecode, of the last program run is written to the file
+    'python_source', or 'disassembly', if given.
+    """
+
+    def __init__(self, parser='ply', max_errors=None, token_cache=None, program_cache=None, engine='tree',
+                 python_source=None, disassembly=None):
+        self._backend = parser
+        self._engine = engine
+        self._python_source = python_source
+        self._disassembly = disassembly
+        self._local = threading.local()
+        self._max_errors = max_errors
+        self._token_cache = None
+        if token_cache is not None:
+            self._token_cache = TokenCache(token_cache, lexical_specs.token_classes)
+        self._program_cache = None
+        if program_cache is not None:
+            self._program_cache = ProgramCache(program_cache)
+
+    def getParser(self):
+        parser = getattr(self._local, 'parser', None)
+        if parser is None:
+            parser = self._local.parser = buildParser(self._backend)
+        return parser
+
+    def load(self, source):
+        """
+        Returns the checked tree of the program in 'source'.
+        """
+        ast = None
+        if self._program_cache is not None:
+            ast = self._program_cache.load(source)
+        if ast is None:
+            lexer = Lexer(module=lexical_specs,
+                          inputString=source,
+                          tables=lextab,
+                          max_errors=self._max_errors,
+                          cache=self._token_cache)
+            ast = self.getParser().parse(lexer=lexer)
+            ast.check()
+            if self._program_cache is not None:
+                self._program_cache.store(source, ast)
+        return ast
+
+    def run(self, source, context=None):
+        """
+        Runs the program in 'source' and returns its exit status.
+        """
+        if context is None:
+            context = Context()
+        try:
+            ast = self.load(source)
+            if self._engine == 'closures':
+                closures.compileProgram(ast).execute(context)
+            elif self._engine == 'python':
+                program = pygen.compileProgram(ast)
+                if self._python_source is not None:
+                    with open(self._python_source, 'w') as file:
+                        file.write(program.getSource())
+                program.execute(context)
+            elif self._engine == 'vm':
+                program = bytecode.compileProgram(ast)
+                if self._disassembly is not None:
+                    with open(self._disassembly, 'w') as file:
+                        file.write(bytecode.disassemble(program))
+                program.execute(context)
+            else:
+                ast.execute(context)
+            return SUCCESS
+        except LexicographicalError as le:
+            context.write("%s\n" % le)
+            return ERR_LEXICOGRAPHICAL_ERROR
+        except TrinitySyntaxError as se:
+            context.write("%s\n" % se)
+            return ERR_SYNTAX_ERROR
+        except TrinityScopeError as sce:
+            context.write("%s\n" % sce)
+            return ERR_SCOPE_ERROR
+        except TrinityTypeError as te:
+            context.write("%s\n" % te)
+            return ERR_TYPE_ERROR
+        except TrinityMatrixDimensionError as mde:
+            context.write("%s\n" % mde)
+            return ERR_MATRIX_DIM_ERROR
+        except TrinityZeroDivisionError:
+            return ERR_ZERO_DIVISION
+        except TrinityMatrixDimensionAccessError:
+            return ERR_MATRIX_DIM_ACCESS_ERROR
+
+    def runFile(self, filename, context=None):
+        """
+        Runs the program in the file 'filename' and returns its exit status.
+        """
+        if context is None:
+            context = Context()
+        try :
+            file = open(filename, 'r')
+        except IOError as e:
+            context.write("trinity: IOError: %s\n" % str(e))
+            return ERR_BAD_FILENAME
+
+        try:
+            # The lexer reads the program straight from the mapped file, so it
+            # is not kept twice in memory. Empty files and pipes can not be
+            # mapped.
+            source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (EnvironmentError, ValueError):
+            try:
+                source = file.read()
+            except IOError as e:
+                context.write("trinity: IOError: %s\n" % str(e))
+                return ERR_IO_ERROR
+        return self.run(source, context)
@@ -21,16 +21,11 @@ class Tk_Comment(OneLineComment):
 class Tk_str(Token):
     _pattern = r'"([^"\\]|\\.)*"'
     _name = 'String'
+    _shows_value = True
 
-    def __init__(self, pattern=None):
-        super(Tk_str, self).__init__(pattern=pattern)
-        self._shows_value = True
-
-    def match(self, line_no, col_no, inputString):
-        ret = super(Tk_str, self).match(line_no, col_no, inputString)
-        if ret is not None:
-            ret._value = ret._value[1:len(ret._value)-1]
-        return ret
+    @classmethod
+    def getLexeme(cls, text):
+        return text[1:len(text)-1]
 
     def getSpan(self):
         if self._value is not None:
@@ -41,24 +36,16 @@ class Tk_str(Token):
 class Tk_ID(Token):
     _pattern = r'[a-zA-Z][a-zA-Z0-9_]*'
     _name = 'Id'
-
-    def __init__(self, pattern=None):
-        super(Tk_ID, self).__init__(pattern=pattern)
-        self._shows_value = True
+    _shows_value = True
 
 class Tk_num(Token):
     _pattern = r'[-]?([0-9]+)(\.[0-9]+)?'
     _name = 'Number'
+    _shows_value = True
 
-    def __init__(self, pattern=None):
-        super(Tk_num, self).__init__(pattern=pattern)
-        self._shows_value = True
-
-    def match(self, line_no, col_no, inputString):
-        ret = super(Tk_num, self).match(line_no, col_no, inputString)
-        if ret is not None:
-            self._shown_value = float(self._value) if '.' in self._value else int(self._value)
-        return ret
+    @classmethod
+    def getShownValue(cls, value):
+        return float(value) if '.' in value else int(value)
 
 class Tk_true(Token):
     _pattern = r'\btrue\b'
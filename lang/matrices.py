@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# matrices.py
+#
+# Values of the Trinity matrices, and the operations on them,
+# for programs run walking their tree
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class ListMatrices(object):
+    """
+    Matrices as lists of rows, each one a list of numbers. Every operation
+    is computed element by element.
+    """
+
+    name = 'lists'
+
+    def matrix(self, rows):
+        """
+        Returns the matrix with the elements in 'rows', a list of lists.
+        """
+        return rows
+
+    def zeros(self, rows, cols):
+        return [[0] * cols for _ in xrange(rows)]
+
+    def isMatrix(self, value):
+        return isinstance(value, list)
+
+    def copy(self, matrix):
+        return [list(row) for row in matrix]
+
+    def equal(self, e1, e2):
+        return e1 == e2
+
+    def add(self, e1, e2):
+        return [[a + b for a, b in zip(r1, r2)] for r1, r2 in zip(e1, e2)]
+
+    def subtract(self, e1, e2):
+        return [[a - b for a, b in zip(r1, r2)] for r1, r2 in zip(e1, e2)]
+
+    def product(self, left, right):
+        """
+        Computes dot product. An MxP matrix with an PxN matrix, resulting in an
+        MxN matrix.
+        """
+        from itertools import product
+        cols, rows = len(right[0]), len(right)
+        result_rows = xrange(len(left))
+        result_matrix = [[0] * cols for _ in result_rows]
+        for i in result_rows:
+            for j, k in product(xrange(cols), xrange(rows)):
+                result_matrix[i][j] += left[i][k] * right[k][j]
+        return result_matrix
+
+    def scalar(self, matrix, scalar, operation):
+        """
+        Applies 'operation' to each element of 'matrix' and 'scalar'.
+        """
+        return [[operation(y, scalar) for y in row] for row in matrix]
+
+    def scalarLeft(self, matrix, scalar, operation):
+        """
+        Applies 'operation' to 'scalar' and each element of 'matrix'.
+        """
+        return [[operation(scalar, y) for y in row] for row in matrix]
+
+    def negate(self, matrix):
+        return [[- y for y in row] for row in matrix]
+
+    def transpose(self, matrix):
+        return [list(col) for col in zip(*matrix)]
+
+
+class NumpyMatrices(ListMatrices):
+    """
+    Matrices as NumPy arrays. Their elements are the same Python numbers a
+    list would hold, so integers never overflow, integers and reals are
+    printed as before, and dividing by zero raises ZeroDivisionError; each
+    operation is a single call over the whole array. The product is
+    computed on arrays of machine integers or reals when the result is
+    bound to be the same.
+    """
+
+    name = 'numpy'
+
+    # Integers whose products and sums can not overflow a machine integer
+    # are below this bound
+    LIMIT = 2 ** 63
+
+    def matrix(self, rows):
+        matrix = numpy.empty((len(rows), len(rows[0])), dtype=object)
+        matrix[:] = rows
+        return matrix
+
+    def zeros(self, rows, cols):
+        return numpy.zeros((rows, cols), dtype=object)
+
+    def isMatrix(self, value):
+        return isinstance(value, numpy.ndarray)
+
+    def copy(self, matrix):
+        return matrix.copy()
+
+    def equal(self, e1, e2):
+        # The elements are compared as the ones of lists are
+        return e1.tolist() == e2.tolist()
+
+    def add(self, e1, e2):
+        return e1 + e2
+
+    def subtract(self, e1, e2):
+        return e1 - e2
+
+    def product(self, left, right):
+        left_types = set(map(type, left.flat))
+        right_types = set(map(type, right.flat))
+        if left_types == set([int]) and right_types == set([int]):
+            bound = max(abs(left).max(), abs(right).max())
+            if bound * bound * left.shape[1] < self.LIMIT:
+                return numpy.dot(left.astype(numpy.int64), right.astype(numpy.int64)).astype(object)
+        elif (left_types == set([float]) and right_types <= set([int, float])
+                or right_types == set([float]) and left_types <= set([int, float])):
+            return self._realProduct(left.astype(numpy.float64), right.astype(numpy.float64))
+        # Each element is the sum, from 0 and in order, of the products
+        return numpy.dot(left, right) + 0
+
+    def _realProduct(self, left, right):
+        # Every product is a real one, and they are added in the same order
+        # as by lists, from 0, so the results are the same to the last bit
+        result = numpy.zeros((left.shape[0], right.shape[1]))
+        with numpy.errstate(all='ignore'):
+            for k in xrange(left.shape[1]):
+                result += numpy.outer(left[:, k], right[k, :])
+        return result.astype(object)
+
+    def scalar(self, matrix, scalar, operation):
+        return operation(matrix, scalar)
+
+    def scalarLeft(self, matrix, scalar, operation):
+        return operation(scalar, matrix)
+
+    def negate(self, matrix):
+        return - matrix
+
+    def transpose(self, matrix):
+        return matrix.T.copy()
+
+
+if numpy is not None:
+    matrices = NumpyMatrices()
+else:
+    matrices = ListMatrices()
+
+# Lists of rows are the matrices of the other engines
+lists = ListMatrices()
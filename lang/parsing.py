@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# parsing.py
+#
+# Construction of the Trinity parser from prebuilt tables
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+import os
+
+_tabmodule = 'lang.parsetab'
+_directory = os.path.dirname(os.path.abspath(__file__))
+
+def buildParser(backend='ply'):
+    """
+    Returns a parser for Trinity. The 'ply' backend is built from the tables
+    in lang/parsetab.py. If they are missing or out of date, the tables are
+    generated in memory, but no file is written and nothing is printed. The
+    'pratt' backend is the hand-written parser of lang/pratt.py, which does
+    not need PLY at all.
+    """
+    if backend == 'pratt':
+        from pratt import PrattParser
+        return PrattParser()
+    import syntactic_specs
+    import ply.yacc as yacc
+    return yacc.yacc(module=syntactic_specs,
+                     tabmodule=_tabmodule,
+                     outputdir=_directory,
+                     debug=False,
+                     write_tables=False,
+                     errorlog=yacc.NullLogger())
+
+def writeTables():
+    """
+    Generates the parse tables, if lang/parsetab.py is missing or out of
+    date, and writes them there. Grammar warnings are printed to stderr.
+    """
+    import syntactic_specs
+    import ply.yacc as yacc
+    yacc.yacc(module=syntactic_specs,
+              tabmodule=_tabmodule,
+              outputdir=_directory,
+              debug=False,
+              write_tables=True)
@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# pratt.py
+#
+# Hand-written parser for Trinity: recursive descent for the
+# program structure, and operator precedence (Pratt) parsing
+# for the expressions. Builds the same tree the PLY parser
+# built from syntactic_specs does, without PLY.
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+from syntactic_specs import p_error
+
+from ast import *
+
+# Without position tracking PLY gives line and column 0 to every nonterminal,
+# which is what the grammar rules pass as the position of most nodes
+NOWHERE = (0, 0)
+
+# Binding powers, from the precedence rules of syntactic_specs
+OR = 1
+AND = 2
+COMPARISON = 3
+NOT = 4
+ADDITION = 5
+MULTIPLICATION = 6
+UMINUS = 7
+
+class PrattParser(object):
+    """
+    Parses the tokens given by a lexer, as the parser built by PLY does,
+    with the same interface: parse(lexer=lexer) returns the tree of the
+    program, and syntax errors are reported by p_error, on the same token.
+
+    The expressions follow the precedence rules of syntactic_specs, and the
+    way PLY resolves the conflicts they leave:
+
+      - An identifier followed by '[' is always a projected variable, so
+        '-a[1]' is '-(a[1])'.
+      - '[' has no precedence, so after any other expression it projects
+        the whole expression parsed so far, up to the enclosing delimiter:
+        'a + b[1]' is '(a + b)[1]'.
+      - Comparisons are not associative: 'a == b == c' is a syntax error.
+    """
+
+    _binary = {
+        'Tk_or'     : (OR, Or),
+        'Tk_and'    : (AND, And),
+        'Tk_eq'     : (COMPARISON, Equivalence),
+        'Tk_neq'    : (COMPARISON, NotEquivalence),
+        'Tk_geq'    : (COMPARISON, GreaterOrEqual),
+        'Tk_leq'    : (COMPARISON, LessOrEqual),
+        'Tk_great'  : (COMPARISON, Greater),
+        'Tk_less'   : (COMPARISON, Less),
+        'Tk_plus'   : (ADDITION, Sum),
+        'Tk_minus'  : (ADDITION, Subtraction),
+        'Tk_mplus'  : (ADDITION, MatrixSum),
+        'Tk_mminus' : (ADDITION, MatrixSubtraction),
+        'Tk_times'  : (MULTIPLICATION, Times),
+        'Tk_rdiv'   : (MULTIPLICATION, RealDivision),
+        'Tk_rmod'   : (MULTIPLICATION, RealModulus),
+        'Tk_div'    : (MULTIPLICATION, Division),
+        'Tk_mod'    : (MULTIPLICATION, Modulus),
+        'Tk_mtimes' : (MULTIPLICATION, MatrixTimes),
+        'Tk_mrdiv'  : (MULTIPLICATION, MatrixRealDivision),
+        'Tk_mrmod'  : (MULTIPLICATION, MatrixRealModulus),
+        'Tk_mdiv'   : (MULTIPLICATION, MatrixDivision),
+        'Tk_mmod'   : (MULTIPLICATION, MatrixModulus)
+        }
+
+    _types = ('Tk_bool', 'Tk_number', 'Tk_mat', 'Tk_row', 'Tk_col')
+
+    def parse(self, input=None, lexer=None):
+        if input is not None:
+            lexer.input(input)
+        self._lexer = lexer
+        self._next()
+        tree = self._trinity()
+        if self._token is not None:
+            p_error(self._token)
+        return tree
+
+    def _next(self):
+        token = self._token = self._lexer.token()
+        return token
+
+    def _at(self, kind):
+        return self._token is not None and self._token.type == kind
+
+    def _expect(self, kind):
+        token = self._token
+        if token is None or token.type != kind:
+            p_error(token)
+        self._next()
+        return token
+
+    ############################################################################
+    ############################ Program structure #############################
+    ############################################################################
+
+    def _trinity(self):
+        functions = []
+        while self._at('Tk_function'):
+            functions.append(self._function())
+        self._expect('Tk_prog')
+        statements = self._statements('Tk_end')
+        self._expect('Tk_end')
+        self._expect('Tk_scolon')
+        return Trinity(NOWHERE, functions, statements)
+
+    def _function(self):
+        self._expect('Tk_function')
+        name = self._expect('Tk_ID').value
+        self._expect('Tk_oparen')
+        params = []
+        if not self._at('Tk_cparen'):
+            params.append(self._formalParameter())
+            while self._at('Tk_comma'):
+                self._next()
+                params.append(self._formalParameter())
+        self._expect('Tk_cparen')
+        self._expect('Tk_ret')
+        return_type = self._type()
+        self._expect('Tk_beg')
+        statements = self._statements('Tk_end')
+        self._expect('Tk_end')
+        self._expect('Tk_scolon')
+        return FunctionDefinition(NOWHERE, name, params, return_type, statements)
+
+    def _formalParameter(self):
+        data_type = self._type()
+        return FormalParameter(NOWHERE, data_type, self._expect('Tk_ID').value)
+
+    def _type(self):
+        token = self._token
+        kind = token is not None and token.type
+        if kind == 'Tk_bool':
+            self._next()
+            return BooleanType(NOWHERE)
+        if kind == 'Tk_number':
+            self._next()
+            return NumberType(NOWHERE)
+        if kind == 'Tk_mat':
+            self._next()
+            self._expect('Tk_oparen')
+            rows = self._expect('Tk_num').value
+            self._expect('Tk_comma')
+            cols = self._expect('Tk_num').value
+            self._expect('Tk_cparen')
+            return MatrixType(NOWHERE, rows, cols)
+        if kind == 'Tk_row':
+            self._next()
+            self._expect('Tk_oparen')
+            size = self._expect('Tk_num').value
+            self._expect('Tk_cparen')
+            return RowVectorType(NOWHERE, size)
+        if kind == 'Tk_col':
+            self._next()
+            self._expect('Tk_oparen')
+            size = self._expect('Tk_num').value
+            self._expect('Tk_cparen')
+            return ColumnVectorType(NOWHERE, size)
+        p_error(token)
+
+    def _statements(self, *ends):
+        statements = []
+        while self._token is not None and self._token.type not in ends:
+            statements.append(self._statement())
+        return statements
+
+    def _statement(self):
+        token = self._token
+        kind = token is not None and token.type
+        if kind == 'Tk_print':
+            self._next()
+            printables = [self._printable()]
+            while self._at('Tk_comma'):
+                self._next()
+                printables.append(self._printable())
+            self._expect('Tk_scolon')
+            return PrintStatement(NOWHERE, printables)
+        if kind == 'Tk_read':
+            self._next()
+            name = self._expect('Tk_ID')
+            self._expect('Tk_scolon')
+            return ReadStatement(NOWHERE, Variable((name.lineno, name.lexpos), name.value))
+        if kind == 'Tk_set':
+            self._next()
+            name = self._expect('Tk_ID')
+            if self._at('Tk_obrack'):
+                lvalue = self._projectedVariable(name)
+            else:
+                lvalue = Variable(NOWHERE, name.value)
+            self._expect('Tk_assign')
+            value = self._expression()
+            self._expect('Tk_scolon')
+            return AssignmentStatement(NOWHERE, lvalue, value)
+        if kind == 'Tk_ret':
+            self._next()
+            value = self._expression()
+            self._expect('Tk_scolon')
+            return ReturnStatement(NOWHERE, value)
+        if kind == 'Tk_if':
+            self._next()
+            condition = self._expression()
+            self._expect('Tk_then')
+            then = self._statements('Tk_end', 'Tk_else')
+            if self._at('Tk_else'):
+                self._next()
+                otherwise = self._statements('Tk_end')
+                self._expect('Tk_end')
+                self._expect('Tk_scolon')
+                return IfStatement(NOWHERE, condition, then, otherwise)
+            self._expect('Tk_end')
+            self._expect('Tk_scolon')
+            return IfStatement(NOWHERE, condition, then)
+        if kind == 'Tk_for':
+            self._next()
+            name = self._expect('Tk_ID').value
+            self._expect('Tk_in')
+            iterable = self._expression()
+            self._expect('Tk_do')
+            statements = self._statements('Tk_end')
+            self._expect('Tk_end')
+            self._expect('Tk_scolon')
+            return ForStatement(NOWHERE, name, iterable, statements)
+        if kind == 'Tk_while':
+            self._next()
+            condition = self._expression()
+            self._expect('Tk_do')
+            statements = self._statements('Tk_end')
+            self._expect('Tk_end')
+            self._expect('Tk_scolon')
+            return WhileStatement(NOWHERE, condition, statements)
+        if kind == 'Tk_use':
+            self._next()
+            declarations = []
+            while self._token is not None and self._token.type in self._types:
+                declarations.append(self._declaration())
+            self._expect('Tk_in')
+            statements = self._statements('Tk_end')
+            self._expect('Tk_end')
+            self._expect('Tk_scolon')
+            return BlockStatement(NOWHERE, declarations, statements)
+        expression = self._expression()
+        self._expect('Tk_scolon')
+        return DiscardedExpression(NOWHERE, expression)
+
+    def _printable(self):
+        if self._at('Tk_str'):
+            return StringLiteral(NOWHERE, self._expect('Tk_str').value)
+        return self._expression()
+
+    def _declaration(self):
+        data_type = self._type()
+        name = self._expect('Tk_ID').value
+        if self._at('Tk_assign'):
+            self._next()
+            value = self._expression()
+            self._expect('Tk_scolon')
+            return VariableDeclarationAssign(NOWHERE, data_type, name, value)
+        self._expect('Tk_scolon')
+        return VariableDeclaration(NOWHERE, data_type, name)
+
+    ############################################################################
+    ############################### Expressions ################################
+    ############################################################################
+
+    def _expression(self, power=0):
+        """
+        Parses an expression whose operators bind tighter than 'power'.
+        """
+        left = self._prefix()
+        comparison = False
+        while self._token is not None:
+            kind = self._token.type
+            if kind == 'Tk_trans':
+                self._next()
+                left = Transpose(NOWHERE, left)
+                comparison = False
+            elif kind == 'Tk_obrack':
+                if power > 0:
+                    break
+                left = self._projection(left)
+                comparison = False
+            elif kind in self._binary:
+                binding, node = self._binary[kind]
+                if binding <= power:
+                    break
+                if comparison and binding == COMPARISON:
+                    p_error(self._token)
+                self._next()
+                left = node(NOWHERE, left, self._expression(binding))
+                comparison = binding == COMPARISON
+            else:
+                break
+        return left
+
+    def _prefix(self):
+        token = self._token
+        kind = token is not None and token.type
+        if kind == 'Tk_minus':
+            self._next()
+            return UnaryMinus(NOWHERE, self._expression(UMINUS))
+        if kind == 'Tk_not':
+            self._next()
+            return Not(NOWHERE, self._expression(NOT))
+        if kind == 'Tk_oparen':
+            self._next()
+            expression = self._expression()
+            self._expect('Tk_cparen')
+            return expression
+        if kind == 'Tk_true':
+            self._next()
+            return TrueLiteral(NOWHERE)
+        if kind == 'Tk_false':
+            self._next()
+            return FalseLiteral(NOWHERE)
+        if kind == 'Tk_num':
+            self._next()
+            return NumberLiteral(NOWHERE, token.value)
+        if kind == 'Tk_obrace':
+            return self._matrix()
+        if kind == 'Tk_ID':
+            self._next()
+            if self._at('Tk_oparen'):
+                return self._functionCall(token)
+            if self._at('Tk_obrack'):
+                return self._projectedVariable(token)
+            return Variable(NOWHERE, token.value)
+        p_error(token)
+
+    def _matrix(self):
+        self._expect('Tk_obrace')
+        rows = [self._row()]
+        while self._at('Tk_colon'):
+            self._next()
+            rows.append(self._row())
+        self._expect('Tk_cbrace')
+        return MatrixLiteral(NOWHERE, rows)
+
+    def _row(self):
+        row = [self._expression()]
+        while self._at('Tk_comma'):
+            self._next()
+            row.append(self._expression())
+        return row
+
+    def _functionCall(self, name):
+        self._expect('Tk_oparen')
+        arguments = []
+        if not self._at('Tk_cparen'):
+            arguments.append(self._expression())
+            while self._at('Tk_comma'):
+                self._next()
+                arguments.append(self._expression())
+        self._expect('Tk_cparen')
+        return FunctionCall(NOWHERE, name.value, arguments)
+
+    def _projectedVariable(self, name):
+        variable = Variable((name.lineno, name.lexpos), name.value)
+        self._expect('Tk_obrack')
+        row = self._expression()
+        if self._at('Tk_comma'):
+            self._next()
+            col = self._expression()
+            self._expect('Tk_cbrack')
+            return ProjectedVariable(NOWHERE, variable, row, col)
+        self._expect('Tk_cbrack')
+        return ProjectedVariable(NOWHERE, variable, row)
+
+    def _projection(self, matrix):
+        self._expect('Tk_obrack')
+        row = self._expression()
+        if self._at('Tk_comma'):
+            self._next()
+            col = self._expression()
+            self._expect('Tk_cbrack')
+            return ProjectedMatrix(NOWHERE, matrix, row, col)
+        self._expect('Tk_cbrack')
+        return ProjectedVector(NOWHERE, matrix, row)
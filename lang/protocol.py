@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# protocol.py
+#
+# Messages between the trinity daemon and its clients
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+import os
+
+# A request holds the source of a program and its standard input. The
+# response, its exit status, standard output and standard error. Each field
+# is sent as its length in decimal, a newline, and its bytes.
+
+def defaultSocket():
+    """
+    Returns the path of the socket used when none is given.
+    """
+    return os.environ.get('TRINITY_SOCKET', '/tmp/trinity-%d.sock' % os.getuid())
+
+def writeMessage(stream, fields):
+    for field in fields:
+        stream.write("%d\n" % len(field))
+        stream.write(field)
+    stream.flush()
+
+def readMessage(stream, count):
+    """
+    Returns the 'count' fields read from 'stream', or None if it was closed
+    before a whole message was read.
+    """
+    fields = []
+    for i in range(count):
+        length = stream.readline()
+        if not length.endswith("\n"):
+            return None
+        field = stream.read(int(length))
+        if len(field) != int(length):
+            return None
+        fields += [field]
+    return fields
+
+def writeRequest(stream, source, input):
+    writeMessage(stream, (source, input))
+
+def readRequest(stream):
+    return readMessage(stream, 2)
+
+def writeResponse(stream, status, output, errors):
+    writeMessage(stream, (str(status), output, errors))
+
+def readResponse(stream):
+    response = readMessage(stream, 3)
+    if response is None:
+        return None
+    status, output, errors = response
+    return (int(status), output, errors)
@@ -0,0 +1,502 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# pygen.py
+#
+# Backend that translates a checked Trinity tree into Python
+# source, compiled and run by Python itself
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+from ast import *
+from sym_table import Boolean, Number, Matrix
+from closures import unescape, formatValue, zeroDivision
+from context import Context
+
+import operator
+import re
+
+_number_pattern = re.compile('[-]?([0-9]+)(\.[0-9]+)?')
+_boolean_pattern = re.compile('(True|False)')
+
+################################################################################
+# Run time support of the generated code
+
+def readNumber(context, current):
+    ret = _number_pattern.match(context.readLine())
+    if ret is None:
+        return current
+    value = ret.group()
+    return float(value) if '.' in value else int(value)
+
+def readBoolean(context, current):
+    ret = _boolean_pattern.match(context.readLine())
+    if ret is None:
+        return current
+    return ret.group() == 'True'
+
+def numberDivision(e1, e2, operation, position):
+    try:
+        return operation(e1, e2)
+    except ZeroDivisionError:
+        raise zeroDivision(position)
+
+def matrixSum(e1, e2):
+    return [[a + b for a, b in zip(r1, r2)] for r1, r2 in zip(e1, e2)]
+
+def matrixSubtraction(e1, e2):
+    return [[a - b for a, b in zip(r1, r2)] for r1, r2 in zip(e1, e2)]
+
+def matrixScalar(matrix, scalar, operation, position):
+    try:
+        return [[operation(y, scalar) for y in row] for row in matrix]
+    except ZeroDivisionError:
+        raise zeroDivision(position)
+
+def scalarMatrix(matrix, scalar, operation, position):
+    # The matrix is the first argument, as it is computed first
+    try:
+        return [[operation(scalar, y) for y in row] for row in matrix]
+    except ZeroDivisionError:
+        raise zeroDivision(position)
+
+def negateMatrix(matrix):
+    return [[- y for y in row] for row in matrix]
+
+def transposeMatrix(matrix):
+    return [list(col) for col in zip(*matrix)]
+
+def projectMatrix(matrix, row, col, position):
+    i = projectionIndex(row, len(matrix), position)
+    return matrix[i][projectionIndex(col, len(matrix[0]), position)]
+
+def projectVector(matrix, component, position):
+    if len(matrix) == 1:
+        return matrix[0][projectionIndex(component, len(matrix[0]), position)]
+    return matrix[projectionIndex(component, len(matrix), position)][0]
+
+def logicalAnd(e1, e2):
+    return e1 and e2
+
+def logicalOr(e1, e2):
+    return e1 or e2
+
+_runtime = {
+    'Context': Context,
+    'copyValue': copyValue,
+    'formatValue': formatValue,
+    'logicalAnd': logicalAnd,
+    'logicalOr': logicalOr,
+    'matrixProduct': Times.matrix_multiply,
+    'matrixScalar': matrixScalar,
+    'matrixSubtraction': matrixSubtraction,
+    'matrixSum': matrixSum,
+    'negateMatrix': negateMatrix,
+    'numberDivision': numberDivision,
+    'operator': operator,
+    'projectMatrix': projectMatrix,
+    'projectVector': projectVector,
+    'projectionIndex': projectionIndex,
+    'readBoolean': readBoolean,
+    'readNumber': readNumber,
+    'scalarMatrix': scalarMatrix,
+    'transposeMatrix': transposeMatrix,
+    'zeros': Matrix.zeros,
+    }
+
+################################################################################
+# Translation
+
+_divisions = {
+    Division: 'operator.floordiv',
+    Modulus: 'operator.mod',
+    RealDivision: 'operator.div',
+    RealModulus: 'operator.mod',
+    }
+
+_scalars = {
+    MatrixSum: 'operator.add',
+    MatrixSubtraction: 'operator.sub',
+    MatrixTimes: 'operator.mul',
+    MatrixDivision: 'operator.floordiv',
+    MatrixModulus: 'operator.mod',
+    MatrixRealDivision: 'operator.div',
+    MatrixRealModulus: 'operator.mod',
+    }
+
+_comparisons = {
+    Equivalence: '==',
+    NotEquivalence: '!=',
+    GreaterOrEqual: '>=',
+    LessOrEqual: '<=',
+    Greater: '>',
+    Less: '<',
+    }
+
+
+class _Scope(object):
+    # Names declared in a scope, and the Python names given to them
+
+    def __init__(self, father=None):
+        self._father = father
+        self._names = {}
+
+    def declare(self, name, python_name):
+        self._names[name] = python_name
+
+    def lookup(self, name):
+        if name in self._names:
+            return self._names[name]
+        return self._father.lookup(name)
+
+
+class PythonGenerator(object):
+    """
+    Translates a checked Trinity tree into the source of a Python module.
+    Each Trinity function becomes a Python function, and the program the
+    function 'main'; all of them take the Context of the run first. Each
+    variable becomes a local variable, renamed so that variables hidden in
+    inner scopes get names of their own. Evaluation order, copies of
+    matrices and error reporting follow Trinity.execute.
+    """
+
+    INDENT = "    "
+
+    def __init__(self):
+        self._lines = []
+        self._level = 0
+        self._scope = None
+        self._used = None
+        self._temporaries = 0
+
+    def generate(self, ast):
+        self._emit("# Generated from a Trinity program")
+        for fun in ast._functions:
+            self._emit("")
+            self._function(fun)
+        self._emit("")
+        self._emit("def main(context):")
+        self._level += 1
+        self._begin()
+        self._emit("write = context.write")
+        self._statements(ast._statements)
+        self._emit("return None")
+        self._level -= 1
+        return "\n".join(self._lines) + "\n"
+
+    def _emit(self, line):
+        self._lines.append(self.INDENT * self._level + line if line else line)
+
+    def _begin(self):
+        self._scope = _Scope()
+        self._used = set(['context', 'write'])
+        self._temporaries = 0
+
+    def _declare(self, name):
+        python_name = "v_%s" % name
+        count = 0
+        while python_name in self._used:
+            count += 1
+            python_name = "v_%s_%d" % (name, count)
+        self._used.add(python_name)
+        self._scope.declare(name, python_name)
+        return python_name
+
+    def _temporary(self):
+        self._temporaries += 1
+        return "t_%d" % self._temporaries
+
+    def _enter(self):
+        self._scope = _Scope(self._scope)
+
+    def _leave(self):
+        self._scope = self._scope._father
+
+    def _function(self, fun):
+        self._begin()
+        params = [self._declare(param._name) for param in fun._params]
+        self._emit("def f_%s(%s):" % (fun.getName(), ", ".join(['context'] + params)))
+        self._level += 1
+        self._emit("write = context.write")
+        for param, name in zip(fun._params, params):
+            if type(param._type) is Matrix:
+                self._emit("%s = copyValue(%s)" % (name, name))
+        self._statements(fun._statements)
+        self._emit("return None")
+        self._level -= 1
+
+    def _statements(self, statements):
+        if statements is None or statements == []:
+            self._emit("pass")
+            return
+        for statement in statements:
+            getattr(self, '_statement' + type(statement).__name__)(statement)
+
+    ############################################################################
+    # Statements
+
+    def _statementPrintStatement(self, node):
+        for printable in node._printables:
+            if type(printable) is StringLiteral:
+                self._emit("write(%r)" % unescape(printable._value))
+            else:
+                self._emit("write(formatValue(%s))" % self._expression(printable))
+
+    def _statementReadStatement(self, node):
+        name = self._scope.lookup(node._variable._id)
+        if type(node._variable._type) is Number:
+            self._emit("%s = readNumber(context, %s)" % (name, name))
+        else:
+            self._emit("%s = readBoolean(context, %s)" % (name, name))
+
+    def _statementAssignmentStatement(self, node):
+        lvalue = node._lvalue
+        if type(lvalue) is Variable:
+            rvalue = self._expression(node._rvalue)
+            if type(node._rvalue._type) is Matrix:
+                rvalue = "copyValue(%s)" % rvalue
+            self._emit("%s = %s" % (self._scope.lookup(lvalue._id), rvalue))
+            return
+        # The cell is found before the value is computed, as in execute()
+        name = self._scope.lookup(lvalue._matrix._id)
+        row, col = self._temporary(), self._temporary()
+        self._emit("%s, %s = %s" % (row, col, self._cell(lvalue)))
+        self._emit("%s[%s][%s] = %s" % (name, row, col, self._expression(node._rvalue)))
+
+    def _statementReturnStatement(self, node):
+        self._emit("return %s" % self._expression(node._expression))
+
+    def _statementDiscardedExpression(self, node):
+        self._emit(self._expression(node._expression))
+
+    def _statementIfStatement(self, node):
+        self._emit("if %s:" % self._expression(node._condition))
+        self._level += 1
+        self._statements(node._statements)
+        self._level -= 1
+        if node._alt_statements is not None and node._alt_statements != []:
+            self._emit("else:")
+            self._level += 1
+            self._statements(node._alt_statements)
+            self._level -= 1
+
+    def _statementForStatement(self, node):
+        iterable = self._expression(node._iterable)
+        if node._statements is None or node._statements == []:
+            self._emit(iterable)
+            return
+        self._enter()
+        item = self._declare(node._item)
+        row = self._temporary()
+        self._emit("for %s in %s:" % (row, iterable))
+        self._level += 1
+        self._emit("for %s in %s:" % (item, row))
+        self._level += 1
+        self._statements(node._statements)
+        self._level -= 2
+        self._leave()
+
+    def _statementWhileStatement(self, node):
+        if node._statements is None or node._statements == []:
+            # The condition is not even evaluated
+            return
+        self._emit("while %s:" % self._expression(node._condition))
+        self._level += 1
+        self._statements(node._statements)
+        self._level -= 1
+
+    def _statementBlockStatement(self, node):
+        self._enter()
+        for declaration in node._declared_vars:
+            getattr(self, '_statement' + type(declaration).__name__)(declaration)
+        if node._statements is not None:
+            for statement in node._statements:
+                getattr(self, '_statement' + type(statement).__name__)(statement)
+        self._leave()
+
+    def _statementVariableDeclaration(self, node):
+        name = self._declare(node._id)
+        data_type = node._type
+        if type(data_type) is Matrix:
+            self._emit("%s = zeros(%d, %d)" % (name, data_type.rows, data_type.cols))
+        else:
+            self._emit("%s = %r" % (name, data_type.initialValue()))
+        return name
+
+    def _statementVariableDeclarationAssign(self, node):
+        # The name is declared before its value is computed, as in execute()
+        name = self._statementVariableDeclaration(node)
+        rvalue = self._expression(node._rvalue)
+        if type(node._type) is Matrix:
+            rvalue = "copyValue(%s)" % rvalue
+        self._emit("%s = %s" % (name, rvalue))
+
+    ############################################################################
+    # Expressions
+
+    def _expression(self, node):
+        return getattr(self, '_expression' + type(node).__name__)(node)
+
+    def _expressionStringLiteral(self, node):
+        return repr(node._value)
+
+    def _expressionTrueLiteral(self, node):
+        return "True"
+
+    def _expressionFalseLiteral(self, node):
+        return "False"
+
+    def _expressionNumberLiteral(self, node):
+        return "(%r)" % node._number
+
+    def _expressionMatrixLiteral(self, node):
+        rows = ["[%s]" % ", ".join(self._expression(elem) for elem in row) for row in node._matrix]
+        return "[%s]" % ", ".join(rows)
+
+    def _expressionVariable(self, node):
+        return self._scope.lookup(node._id)
+
+    def _expressionProjectedMatrix(self, node):
+        if node._component is None:
+            return "projectMatrix(%s, %s, %s, %r)" % (self._expression(node._matrix),
+                                                      self._expression(node._row),
+                                                      self._expression(node._col),
+                                                      node._position)
+        return "projectVector(%s, %s, %r)" % (self._expression(node._matrix),
+                                              self._expression(node._component),
+                                              node._position)
+
+    _expressionProjectedVector = _expressionProjectedMatrix
+
+    def _index(self, expression, size, position):
+        return "projectionIndex(%s, %d, %r)" % (self._expression(expression), size, position)
+
+    def _cell(self, node):
+        # The expression of the row and column projected by a
+        # ProjectedVariable, from 0
+        type_class = node._matrix._type
+        if node._component is None:
+            return "(%s, %s)" % (self._index(node._row, type_class.rows, node._position),
+                                 self._index(node._col, type_class.cols, node._position))
+        elif type_class.rows == 1:
+            return "(0, %s)" % self._index(node._component, type_class.cols, node._position)
+        return "(%s, 0)" % self._index(node._component, type_class.rows, node._position)
+
+    def _expressionProjectedVariable(self, node):
+        name = self._scope.lookup(node._matrix._id)
+        type_class = node._matrix._type
+        if node._component is None:
+            return "%s[%s][%s]" % (name,
+                                   self._index(node._row, type_class.rows, node._position),
+                                   self._index(node._col, type_class.cols, node._position))
+        elif type_class.rows == 1:
+            return "%s[0][%s]" % (name, self._index(node._component, type_class.cols, node._position))
+        return "%s[%s][0]" % (name, self._index(node._component, type_class.rows, node._position))
+
+    def _expressionFunctionCall(self, node):
+        arguments = ['context'] + [self._expression(arg) for arg in node._arguments]
+        return "f_%s(%s)" % (node._id, ", ".join(arguments))
+
+    def _expressionSum(self, node):
+        left, right = self._expression(node._left), self._expression(node._right)
+        if type(node._left._type) is Matrix:
+            return "matrixSum(%s, %s)" % (left, right)
+        return "(%s + %s)" % (left, right)
+
+    def _expressionSubtraction(self, node):
+        left, right = self._expression(node._left), self._expression(node._right)
+        if type(node._left._type) is Matrix:
+            return "matrixSubtraction(%s, %s)" % (left, right)
+        return "(%s - %s)" % (left, right)
+
+    def _expressionTimes(self, node):
+        left, right = self._expression(node._left), self._expression(node._right)
+        if type(node._left._type) is Matrix:
+            return "matrixProduct(%s, %s)" % (left, right)
+        return "(%s * %s)" % (left, right)
+
+    def _division(self, node):
+        return "numberDivision(%s, %s, %s, %r)" % (self._expression(node._left),
+                                                   self._expression(node._right),
+                                                   _divisions[type(node)],
+                                                   node._right._position)
+
+    _expressionDivision = _division
+    _expressionModulus = _division
+    _expressionRealDivision = _division
+    _expressionRealModulus = _division
+
+    def _scalar(self, node):
+        operation = _scalars[type(node)]
+        left, right = self._expression(node._left), self._expression(node._right)
+        if type(node._left._type) is Matrix:
+            return "matrixScalar(%s, %s, %s, %r)" % (left, right, operation, node._right._position)
+        return "scalarMatrix(%s, %s, %s, %r)" % (right, left, operation, node._right._position)
+
+    _expressionMatrixSum = _scalar
+    _expressionMatrixSubtraction = _scalar
+    _expressionMatrixTimes = _scalar
+    _expressionMatrixDivision = _scalar
+    _expressionMatrixModulus = _scalar
+    _expressionMatrixRealDivision = _scalar
+    _expressionMatrixRealModulus = _scalar
+
+    def _comparison(self, node):
+        return "(%s %s %s)" % (self._expression(node._left),
+                               _comparisons[type(node)],
+                               self._expression(node._right))
+
+    _expressionEquivalence = _comparison
+    _expressionNotEquivalence = _comparison
+    _expressionGreaterOrEqual = _comparison
+    _expressionLessOrEqual = _comparison
+    _expressionGreater = _comparison
+    _expressionLess = _comparison
+
+    def _expressionAnd(self, node):
+        # Both operands are always computed
+        return "logicalAnd(%s, %s)" % (self._expression(node._left), self._expression(node._right))
+
+    def _expressionOr(self, node):
+        return "logicalOr(%s, %s)" % (self._expression(node._left), self._expression(node._right))
+
+    def _expressionUnaryMinus(self, node):
+        operand = self._expression(node._operand)
+        if type(node._operand._type) is Matrix:
+            return "negateMatrix(%s)" % operand
+        return "(- %s)" % operand
+
+    def _expressionTranspose(self, node):
+        return "transposeMatrix(%s)" % self._expression(node._operand)
+
+    def _expressionNot(self, node):
+        return "(not %s)" % self._expression(node._operand)
+
+
+class PythonProgram(object):
+    """
+    A Trinity program translated into Python source, and compiled. It can be
+    run many times, each one with its own Context.
+    """
+
+    def __init__(self, source, filename='<trinity>'):
+        self._source = source
+        self._code = compile(source, filename, 'exec', 0, True)
+
+    def getSource(self):
+        return self._source
+
+    def execute(self, context=None):
+        if context is None:
+            context = Context()
+        namespace = dict(_runtime)
+        exec self._code in namespace
+        namespace['main'](context)
+
+
+def compileProgram(ast, filename='<trinity>'):
+    """
+    Returns the PythonProgram of 'ast', a tree already checked.
+    """
+    return PythonProgram(PythonGenerator().generate(ast), filename)
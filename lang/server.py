@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# server.py
+#
+# Daemon that runs Trinity programs sent through a Unix domain
+# socket, with the interpreter already loaded
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+from interpreter import Interpreter, UNCAUGHT_EXCEPTION
+from protocol import readRequest, writeResponse
+from context import Context
+
+import SocketServer
+import cStringIO
+import errno
+import os
+import socket
+import traceback
+
+class RequestHandler(SocketServer.StreamRequestHandler):
+
+    def handle(self):
+        request = readRequest(self.rfile)
+        if request is None:
+            return
+        source, input = request
+        status, output, errors = self.server.runProgram(source, input)
+        try:
+            writeResponse(self.wfile, status, output, errors)
+        except socket.error:
+            # The client went away, nobody is waiting for the response
+            pass
+
+
+class Server(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    """
+    Listens on the socket at 'path' for programs to run, each one in a
+    thread of its own, and answers with the exit status, standard output
+    and standard error the trinity command would have had for them. The
+    parser is built when the server starts. 'options' are given to the
+    Interpreter.
+    """
+
+    # Running programs do not keep the daemon from stopping
+    daemon_threads = True
+
+    def __init__(self, path, **options):
+        self._interpreter = Interpreter(**options)
+        self._interpreter.getParser()
+        try:
+            # A socket left behind by a server that did not stop cleanly
+            os.remove(path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+        SocketServer.UnixStreamServer.__init__(self, path, RequestHandler)
+
+    def runProgram(self, source, input):
+        output = cStringIO.StringIO()
+        errors = cStringIO.StringIO()
+        context = Context(output, cStringIO.StringIO(input))
+        try:
+            status = self._interpreter.run(source, context)
+        except Exception:
+            traceback.print_exc(file=errors)
+            status = UNCAUGHT_EXCEPTION
+        return (status, output.getvalue(), errors.getvalue())
+
+    def server_close(self):
+        SocketServer.UnixStreamServer.server_close(self)
+        try:
+            os.remove(self.server_address)
+        except OSError:
+            pass
@@ -10,6 +10,7 @@
 # Francisco Martinez, 09-10502, <frammnm@gmail.com>
 # ------------------------------------------------------------
 from exceptions import *
+from matrices import matrices
 
 
 class Type(object):
@@ -34,6 +35,9 @@ class String(Type):
     def __str__(self):
         return "String"
 
+    def initialValue(self):
+        return ""
+
     def compare(self, other):
         return type(self) is type(other)
         
@@ -47,6 +51,9 @@ class Boolean(Type):
     def __str__(self):
         return "Boolean"
 
+    def initialValue(self):
+        return False
+
     def compare(self, other):
         return type(self) is type(other)
         
@@ -60,6 +67,9 @@ class Number(Type):
     def __str__(self):
         return "Number"
 
+    def initialValue(self):
+        return 0
+
     def compare(self, other):
         return type(self) is type(other)
 
@@ -75,6 +85,9 @@ class Matrix(Type):
     def __str__(self):
         return "Matrix(%d,%d)" % (self.rows, self.cols)
 
+    def initialValue(self):
+        return matrices.zeros(self.rows, self.cols)
+
     def compare(self, other):
         ok = type(self) is type(other)
         if ok:
@@ -130,7 +143,7 @@ class SymTable(object):
     """
     SPACE="    " 
 
-    def __init__(self, father=None, scope=None, in_function=None, function_type=None, belongs_to=None ):
+    def __init__(self, father=None, scope=None, in_function=None, function_type=None, belongs_to=None):
         """
         Params:
             scope  :
@@ -142,6 +155,7 @@ class SymTable(object):
         """
         if scope is None : self._scope = {}
         else: self._scope = scope
+        self._slots = {}
         self._children = []
         if father is not None: father._birth(self)
         self._father = father
@@ -172,7 +186,8 @@ class SymTable(object):
 
     def addName(self, name, type_class, position, value=None):
         """
-        Adds a new name to the most inmediate scope
+        Adds a new name to the most inmediate scope. Returns the slot of the
+        name in the frames of the scope.
         """
         if name in self._scope:
             error = ""
@@ -181,6 +196,40 @@ class SymTable(object):
             raise TrinityScopeError(error)
 
         self._scope[name] = (type_class, value)
+        return self.reserve(name)
+
+    def reserve(self, name):
+        """
+        Gives 'name' a slot in the frames of the most inmediate scope, and
+        returns it. Addresses found for the name refer to the slot from then
+        on, even before the name is added.
+        """
+        if name not in self._slots:
+            self._slots[name] = len(self._slots)
+        return self._slots[name]
+
+    def size(self):
+        """
+        Returns the number of slots of the frames of the scope.
+        """
+        return len(self._slots)
+
+    def address(self, name, position):
+        """
+        Returns the address of 'name': the number of scopes between the most
+        inmediate one and the one where the name has a slot, and the slot.
+        """
+        depth = 0
+        symtab = self
+        while symtab is not None:
+            if name in symtab._slots:
+                return (depth, symtab._slots[name])
+            symtab = symtab._father
+            depth += 1
+        error = ""
+        error += "In line %d, column %d, " % position
+        error += "variable or function '%s' not defined in this scope" % name
+        raise TrinityScopeError(error)
 
     def _birth(self, child):
         """
@@ -200,7 +249,7 @@ class SymTable(object):
         else:
             error = ""
             error += "In line %d, column %d, " % position
-            error += "variable or function '%s' not defined in this scope" % name.printAST(0)
+            error += "variable or function '%s' not defined in this scope" % name
             raise TrinityScopeError(error)
 
     def setValue(self, name, value, position):
@@ -218,7 +267,7 @@ class SymTable(object):
         else:
             error = ""
             error += "In line %d, column %d, " % position
-            error += "variable or function '%s' not defined in this scope" % name.printAST(0)
+            error += "variable or function '%s' not defined in this scope" % name
             raise TrinityScopeError(error)
 
     def getValue(self, name, position):
@@ -229,11 +278,11 @@ class SymTable(object):
         given name.
         """
         if name in self._scope: return (self._scope[name])[1]
-        elif self._father is not None: return self._father.getValue(name)
+        elif self._father is not None: return self._father.getValue(name, position)
         else:
             error = ""
             error += "In line %d, column %d, " % position
-            error += "variable or function '%s' not defined in this scope" % name.printAST(0)
+            error += "variable or function '%s' not defined in this scope" % name
             raise TrinityScopeError(error)
 
     def get(self, name, position):
@@ -244,11 +293,11 @@ class SymTable(object):
         given name.
         """
         if name in self._scope: return self._scope[name]
-        elif self._father is not None: return self._father.get(name)
+        elif self._father is not None: return self._father.get(name, position)
         else:
             error = ""
             error += "In line %d, column %d, " % position
-            error += "variable or function '%s' not defined in this scope" % name.printAST(0)
+            error += "variable or function '%s' not defined in this scope" % name
             raise TrinityScopeError(error)
 
     def __str__(self):
@@ -262,3 +311,46 @@ class SymTable(object):
         for child in self._children : 
             string += child.printDic(indent +1 )
         return string 
+
+
+class Frame(object):
+    """
+    The values of the names of a scope while a program runs, each one in the
+    slot given to it by the SymTable of the scope when the program was
+    checked, so values are found by their address, not by their name.
+    """
+
+    def __init__(self, size, father=None, context=None):
+        self._values = [None] * size
+        self._father = father
+        if context is None and father is not None:
+            context = father._context
+        self._context = context
+
+    def getContext(self):
+        return self._context
+
+    def getRoot(self):
+        """
+        Returns the outermost frame, the one of the whole program.
+        """
+        frame = self
+        while frame._father is not None:
+            frame = frame._father
+        return frame
+
+    def getValue(self, address):
+        depth, slot = address
+        frame = self
+        while depth > 0:
+            frame = frame._father
+            depth -= 1
+        return frame._values[slot]
+
+    def setValue(self, address, value):
+        depth, slot = address
+        frame = self
+        while depth > 0:
+            frame = frame._father
+            depth -= 1
+        frame._values[slot] = value
@@ -63,7 +63,8 @@ def p_FuncDefinitions_list(p):
     '''
     FuncDefinitions : FuncDefinitions FuncDefinition
     '''
-    p[0] = p[1] + [p[2]]
+    p[1].append(p[2])
+    p[0] = p[1]
 
 def p_FuncDefinitions_lambda(p):
     '''
@@ -101,7 +102,8 @@ def p_FParamList_list(p):
     '''
     FParamList : FParamList Tk_comma FormalParam
     '''
-    p[0] = p[1] + p[3]
+    p[1].extend(p[3])
+    p[0] = p[1]
 
 def p_FormalParam(p):
     '''
@@ -143,7 +145,8 @@ def p_Statements_list(p):
     '''
     Statements : Statements Statement
     '''
-    p[0] = p[1] + [p[2]]
+    p[1].append(p[2])
+    p[0] = p[1]
 
 def p_Statements_lambda(p):
     '''
@@ -178,7 +181,8 @@ def p_PrintableList_list(p):
     '''
     PrintableList : PrintableList Tk_comma Printable
     '''
-    p[0] = p[1] + [p[3]]
+    p[1].append(p[3])
+    p[0] = p[1]
 
 def p_PrintableList_elem(p):
     '''
@@ -284,7 +288,8 @@ def p_VariableDeclarations_list(p):
     '''
     VariableDeclarations : VariableDeclarations VariableDeclaration
     '''
-    p[0] = p[1] + [p[2]]
+    p[1].append(p[2])
+    p[0] = p[1]
 
 def p_VariableDeclarations_elem(p):
     '''
@@ -533,7 +538,8 @@ def p_RowList_list(p):
     '''
     RowList : RowList Tk_colon Row
     '''
-    p[0] = p[1] + [p[3]]
+    p[1].append(p[3])
+    p[0] = p[1]
 
 def p_Row_exp(p):
     '''
@@ -545,7 +551,8 @@ def p_Row(p):
     '''
     Row : Row Tk_comma Expression
     '''
-    p[0] = p[1] + [p[3]]
+    p[1].append(p[3])
+    p[0] = p[1]
 
 def p_FunctionCall(p):
     '''
@@ -570,7 +577,8 @@ def p_ArgList_list(p):
     '''
     ArgList : ArgList Tk_comma Expression
     '''    
-    p[0] = p[1] + [p[3]] 
+    p[1].append(p[3])
+    p[0] = p[1]
 
 
 def p_lambda(p):
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# vm.py
+#
+# Virtual machine that runs the bytecode of Trinity programs
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+from bytecode import *
+from ast import Times, copyValue, projectionIndex
+from closures import formatValue, zeroDivision
+from pygen import (
+    readNumber,
+    readBoolean,
+    matrixSum,
+    matrixSubtraction,
+    matrixScalar,
+    scalarMatrix,
+    negateMatrix,
+    transposeMatrix,
+    projectMatrix,
+    projectVector
+    )
+from context import Context
+
+def elements(matrix):
+    # The elements of 'matrix', row after row, as the for statement takes
+    # them
+    for row in matrix:
+        for element in row:
+            yield element
+
+
+class VirtualMachine(object):
+    """
+    Runs a BytecodeProgram. Each call of a function has a frame of its own,
+    a list of registers; the dispatch loop decodes the instructions of the
+    function from its array, one after the other.
+    """
+
+    def __init__(self, program):
+        self._program = program
+        self._context = None
+
+    def run(self, context=None):
+        if context is None:
+            context = Context()
+        self._context = context
+        self.call(self._program.main, [])
+
+    def call(self, code, arguments):
+        r = code.frame[:]
+        r[:len(arguments)] = arguments
+        for i in code.matrices:
+            r[i] = copyValue(r[i])
+
+        ops = code.code
+        k = code.constants
+        functions = self._program.functions
+        context = self._context
+        write = context.write
+        pc = 0
+        while True:
+            op = ops[pc]
+            if op == MOVE:
+                r[ops[pc + 1]] = r[ops[pc + 2]]
+                pc += 3
+            elif op == JUMPF:
+                if r[ops[pc + 1]]:
+                    pc += 3
+                else:
+                    pc = ops[pc + 2]
+            elif op == JUMP:
+                pc = ops[pc + 1]
+            elif op == ADD:
+                r[ops[pc + 1]] = r[ops[pc + 2]] + r[ops[pc + 3]]
+                pc += 4
+            elif op == SUB:
+                r[ops[pc + 1]] = r[ops[pc + 2]] - r[ops[pc + 3]]
+                pc += 4
+            elif op == MUL:
+                r[ops[pc + 1]] = r[ops[pc + 2]] * r[ops[pc + 3]]
+                pc += 4
+            elif op == LT:
+                r[ops[pc + 1]] = r[ops[pc + 2]] < r[ops[pc + 3]]
+                pc += 4
+            elif op == LE:
+                r[ops[pc + 1]] = r[ops[pc + 2]] <= r[ops[pc + 3]]
+                pc += 4
+            elif op == GT:
+                r[ops[pc + 1]] = r[ops[pc + 2]] > r[ops[pc + 3]]
+                pc += 4
+            elif op == GE:
+                r[ops[pc + 1]] = r[ops[pc + 2]] >= r[ops[pc + 3]]
+                pc += 4
+            elif op == EQ:
+                r[ops[pc + 1]] = r[ops[pc + 2]] == r[ops[pc + 3]]
+                pc += 4
+            elif op == NE:
+                r[ops[pc + 1]] = r[ops[pc + 2]] != r[ops[pc + 3]]
+                pc += 4
+            elif op == GET:
+                r[ops[pc + 1]] = r[ops[pc + 2]][r[ops[pc + 3]]][r[ops[pc + 4]]]
+                pc += 5
+            elif op == SET:
+                r[ops[pc + 1]][r[ops[pc + 2]]][r[ops[pc + 3]]] = r[ops[pc + 4]]
+                pc += 5
+            elif op == IDX:
+                r[ops[pc + 1]] = projectionIndex(r[ops[pc + 2]], ops[pc + 3], k[ops[pc + 4]])
+                pc += 5
+            elif op == NEXT:
+                try:
+                    r[ops[pc + 1]] = r[ops[pc + 2]].next()
+                    pc += 4
+                except StopIteration:
+                    pc = ops[pc + 3]
+            elif op == CALL:
+                first = ops[pc + 3]
+                arguments = r[first:first + ops[pc + 4]]
+                r[ops[pc + 1]] = self.call(functions[ops[pc + 2]], arguments)
+                pc += 5
+            elif op == RET:
+                return r[ops[pc + 1]]
+            elif op == DIV:
+                try:
+                    r[ops[pc + 1]] = r[ops[pc + 2]] // r[ops[pc + 3]]
+                except ZeroDivisionError:
+                    raise zeroDivision(k[ops[pc + 4]])
+                pc += 5
+            elif op == MOD:
+                try:
+                    r[ops[pc + 1]] = r[ops[pc + 2]] % r[ops[pc + 3]]
+                except ZeroDivisionError:
+                    raise zeroDivision(k[ops[pc + 4]])
+                pc += 5
+            elif op == RDIV:
+                try:
+                    r[ops[pc + 1]] = r[ops[pc + 2]] / r[ops[pc + 3]]
+                except ZeroDivisionError:
+                    raise zeroDivision(k[ops[pc + 4]])
+                pc += 5
+            elif op == AND:
+                r[ops[pc + 1]] = r[ops[pc + 2]] and r[ops[pc + 3]]
+                pc += 4
+            elif op == OR:
+                r[ops[pc + 1]] = r[ops[pc + 2]] or r[ops[pc + 3]]
+                pc += 4
+            elif op == NOT:
+                r[ops[pc + 1]] = not r[ops[pc + 2]]
+                pc += 3
+            elif op == NEG:
+                r[ops[pc + 1]] = - r[ops[pc + 2]]
+                pc += 3
+            elif op == PRINT:
+                write(formatValue(r[ops[pc + 1]]))
+                pc += 2
+            elif op == WRITE:
+                write(k[ops[pc + 1]])
+                pc += 2
+            elif op == COPY:
+                r[ops[pc + 1]] = copyValue(r[ops[pc + 2]])
+                pc += 3
+            elif op == ZEROS:
+                r[ops[pc + 1]] = [[0] * ops[pc + 3] for _ in xrange(ops[pc + 2])]
+                pc += 4
+            elif op == MATRIX:
+                first, cols = ops[pc + 4], ops[pc + 3]
+                r[ops[pc + 1]] = [r[i:i + cols] for i in xrange(first, first + ops[pc + 2] * cols, cols)]
+                pc += 5
+            elif op == ITER:
+                r[ops[pc + 1]] = elements(r[ops[pc + 2]])
+                pc += 3
+            elif op == PROJM:
+                r[ops[pc + 1]] = projectMatrix(r[ops[pc + 2]], r[ops[pc + 3]], r[ops[pc + 4]], k[ops[pc + 5]])
+                pc += 6
+            elif op == PROJV:
+                r[ops[pc + 1]] = projectVector(r[ops[pc + 2]], r[ops[pc + 3]], k[ops[pc + 4]])
+                pc += 5
+            elif op == MADD:
+                r[ops[pc + 1]] = matrixSum(r[ops[pc + 2]], r[ops[pc + 3]])
+                pc += 4
+            elif op == MSUB:
+                r[ops[pc + 1]] = matrixSubtraction(r[ops[pc + 2]], r[ops[pc + 3]])
+                pc += 4
+            elif op == MMUL:
+                r[ops[pc + 1]] = Times.matrix_multiply(r[ops[pc + 2]], r[ops[pc + 3]])
+                pc += 4
+            elif op == MNEG:
+                r[ops[pc + 1]] = negateMatrix(r[ops[pc + 2]])
+                pc += 3
+            elif op == TRANS:
+                r[ops[pc + 1]] = transposeMatrix(r[ops[pc + 2]])
+                pc += 3
+            elif op == MAP:
+                r[ops[pc + 1]] = matrixScalar(r[ops[pc + 2]], r[ops[pc + 3]], k[ops[pc + 4]], k[ops[pc + 5]])
+                pc += 6
+            elif op == RMAP:
+                r[ops[pc + 1]] = scalarMatrix(r[ops[pc + 2]], r[ops[pc + 3]], k[ops[pc + 4]], k[ops[pc + 5]])
+                pc += 6
+            elif op == READN:
+                r[ops[pc + 1]] = readNumber(context, r[ops[pc + 1]])
+                pc += 2
+            elif op == READB:
+                r[ops[pc + 1]] = readBoolean(context, r[ops[pc + 1]])
+                pc += 2
+            elif op == RETN:
+                return None
+            else:
+                raise ValueError("bad opcode %d at %d in %s" % (op, pc, code.name))
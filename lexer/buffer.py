@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# buffer.py
+#
+# Compact storage for the tokens found in an input
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+from array import array
+
+class TokenBuffer(object):
+    """
+    Keeps the tokens found in 'source' as parallel arrays of numbers: the
+    index of the token class in 'token_classes', the offsets in 'source'
+    where the lexeme starts and ends, and its line and column. The value of
+    a token is only read from 'source' when it is asked for.
+    """
+
+    def __init__(self, source, token_classes):
+        self._source = source
+        self._kinds = list(token_classes)
+        self._ids = dict((tk, i) for i, tk in enumerate(self._kinds))
+        self._types = array('H')
+        self._starts = array('l')
+        self._ends = array('l')
+        self._lines = array('l')
+        self._columns = array('l')
+
+    def append(self, kind, start, end, line, column):
+        self._types.append(self._ids[kind])
+        self._starts.append(start)
+        self._ends.append(end)
+        self._lines.append(line)
+        self._columns.append(column)
+
+    def getArrays(self):
+        """
+        Returns the arrays of the buffer, without its source, in the order
+        extend() takes them.
+        """
+        return (self._types, self._starts, self._ends, self._lines, self._columns)
+
+    def extend(self, arrays, offset=0):
+        """
+        Appends the tokens kept in 'arrays', as returned by getArrays() from a
+        buffer over the part of the source that starts at 'offset'.
+        """
+        types, starts, ends, lines, columns = arrays
+        if offset != 0:
+            starts = array('l', [start + offset for start in starts])
+            ends = array('l', [end + offset for end in ends])
+        self._types.extend(types)
+        self._starts.extend(starts)
+        self._ends.extend(ends)
+        self._lines.extend(lines)
+        self._columns.extend(columns)
+
+    def getKind(self, index):
+        return self._kinds[self._types[index]]
+
+    def getLine(self, index):
+        return self._lines[index]
+
+    def getColumn(self, index):
+        return self._columns[index]
+
+    def getValue(self, index):
+        lexeme = self._source[self._starts[index]:self._ends[index]]
+        return self.getKind(index).getLexeme(lexeme)
+
+    def __len__(self):
+        return len(self._types)
+
+    def __getitem__(self, index):
+        return BufferedToken(self, index)
+
+    def __iter__(self):
+        for index in xrange(len(self._types)):
+            yield BufferedToken(self, index)
+
+
+class BufferedToken(object):
+    """
+    View of one of the tokens of a TokenBuffer, as it is handed to the
+    parser. Its value is read from the input the first time it is used.
+    """
+    # 'lexer' is only set by PLY, on the token that caused a syntax error
+    __slots__ = ('_buffer', '_index', 'kind', 'type', 'lineno', 'lexpos', 'lexer')
+
+    def __init__(self, buffer, index):
+        self._buffer = buffer
+        self._index = index
+        self.kind = buffer.getKind(index)
+        self.type = self.kind._ply_type
+        self.lineno = buffer.getLine(index)
+        self.lexpos = buffer.getColumn(index)
+
+    @property
+    def value(self):
+        return self._buffer.getValue(self._index)
+
+    def isComment(self):
+        return self.kind.isComment()
+
+    def __repr__(self):
+        return self.__unicode__()
+
+    def __str__(self):
+        return self.__unicode__()
+
+    def __unicode__(self):
+        return self.kind.describe(self.lineno, self.lexpos, self.value)
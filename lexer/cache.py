@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# cache.py
+#
+# Cache on disk of the tokens found in an input
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+from buffer import TokenBuffer
+from dfa import signature
+from array import array
+import errno
+import hashlib
+import marshal
+import os
+import tempfile
+
+class TokenCache(object):
+    """
+    Keeps in 'directory' the tokens found in each input, as the arrays of a
+    TokenBuffer. An entry is found by a hash of the input and of the
+    signature of the token classes, so it is not used after either of them
+    changes.
+    """
+
+    _FORMAT = 1
+
+    def __init__(self, directory, token_classes):
+        self._directory = directory
+        self._token_classes = token_classes
+        self._signature = signature(token_classes)
+        self._last = (None, None)
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    def key(self, source):
+        digest = hashlib.sha1()
+        digest.update("%d %s\n" % (self._FORMAT, self._signature))
+        digest.update(source)
+        return digest.hexdigest()
+
+    def _filename(self, source):
+        # A store usually follows a failed load of the same input, so its
+        # hash is kept not to compute it twice. Both are replaced at once, so
+        # threads sharing the cache never pair an input with another's hash
+        last_source, last_key = self._last
+        if last_source is not source:
+            last_key = self.key(source)
+            self._last = (source, last_key)
+        return os.path.join(self._directory, last_key + '.tokens')
+
+    def load(self, source):
+        """
+        Returns a TokenBuffer with the tokens cached for 'source', or None if
+        there are none.
+        """
+        try:
+            entry = open(self._filename(source), 'rb')
+        except IOError:
+            return None
+        try:
+            try:
+                strings = marshal.load(entry)
+            finally:
+                entry.close()
+            buffer = TokenBuffer(source, self._token_classes)
+            arrays = []
+            for typecode, string in zip(('H', 'l', 'l', 'l', 'l'), strings):
+                arrays += [array(typecode)]
+                arrays[-1].fromstring(string)
+            buffer.extend(arrays)
+        except (EOFError, ValueError, TypeError):
+            return None
+        return buffer
+
+    def store(self, source, buffer):
+        """
+        Writes the tokens of 'buffer', a TokenBuffer over 'source', to the
+        cache. The entry is written aside and then renamed, so a concurrent
+        load never reads half of it.
+        """
+        strings = tuple(numbers.tostring() for numbers in buffer.getArrays())
+        descriptor, temporary = tempfile.mkstemp(dir=self._directory)
+        try:
+            entry = os.fdopen(descriptor, 'wb')
+            try:
+                marshal.dump(strings, entry)
+            finally:
+                entry.close()
+            os.rename(temporary, self._filename(source))
+        except:
+            os.remove(temporary)
+            raise
@@ -0,0 +1,476 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# dfa.py
+#
+# Table-driven scanning engine. DFABuilder turns the token
+# classes of a lexical specification into the transition table
+# of a deterministic finite automaton, ahead of time, and
+# DFAScanner matches lexemes with that table, without regexes.
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+from exceptions import (PatternNotSupportedException,
+                        TablesOutOfDateException)
+from scanner import Scanner
+import hashlib
+import string
+
+# Symbols of the automaton: one for each byte, and OTHER for any character
+# beyond them, which may only be found in unicode inputs.
+OTHER = 256
+ALPHABET = frozenset(range(OTHER + 1))
+WORD = frozenset(ord(c) for c in string.ascii_letters + string.digits + '_')
+DIGIT = frozenset(ord(c) for c in string.digits)
+SPACE = frozenset(ord(c) for c in ' \t\n\r\f\v')
+ESCAPES = {
+    'd' : DIGIT,
+    'D' : ALPHABET - DIGIT,
+    'w' : WORD,
+    'W' : ALPHABET - WORD,
+    's' : SPACE,
+    'S' : ALPHABET - SPACE,
+    'a' : frozenset([ord('\a')]),
+    'f' : frozenset([ord('\f')]),
+    'n' : frozenset([ord('\n')]),
+    'r' : frozenset([ord('\r')]),
+    't' : frozenset([ord('\t')]),
+    'v' : frozenset([ord('\v')])
+    }
+
+def signature(token_classes):
+    """
+    Fingerprint of a list of token classes: their names and patterns, in
+    order.
+    """
+    digest = hashlib.md5()
+    for tk in token_classes:
+        digest.update('%s %s\n' % (tk.__name__, tk._pattern))
+    return digest.hexdigest()
+
+
+class NFA(object):
+    """
+    Nondeterministic finite automaton, built by Thompson's construction. For
+    each state it keeps its transitions on sets of symbols, its empty
+    transitions, and the empty transitions that may only be taken at the end
+    of the line, that stand for '$'.
+    """
+
+    def __init__(self):
+        self.edges = []
+        self.epsilon = []
+        self.eol = []
+
+    def newState(self):
+        self.edges += [[]]
+        self.epsilon += [[]]
+        self.eol += [[]]
+        return len(self.edges) - 1
+
+    def size(self):
+        return len(self.edges)
+
+    def closure(self, states, at_eol=False):
+        closure = set(states)
+        pending = list(states)
+        while len(pending) > 0:
+            state = pending.pop()
+            following = self.epsilon[state]
+            if at_eol:
+                following = following + self.eol[state]
+            for target in following:
+                if target not in closure:
+                    closure.add(target)
+                    pending += [target]
+        return frozenset(closure)
+
+
+class PatternParser(object):
+    """
+    Adds the automaton for a pattern to an NFA. Only the regular expression
+    syntax used by token patterns is supported: alternatives, groups, the
+    '*', '+' and '?' quantifiers, character classes, '.', escapes, and '$'
+    at the end of the pattern.
+    """
+
+    def __init__(self, pattern, nfa):
+        self._pattern = pattern
+        self._nfa = nfa
+        self._pos = 0
+
+    def parse(self):
+        fragment = self._alternation()
+        if self._peek() is not None:
+            self._unsupported()
+        return fragment
+
+    def _unsupported(self):
+        raise PatternNotSupportedException(
+            "Pattern %r is not supported by the DFA (at index %d)" % (
+                self._pattern, self._pos
+                )
+            )
+
+    def _peek(self):
+        if self._pos < len(self._pattern):
+            return self._pattern[self._pos]
+        return None
+
+    def _next(self):
+        char = self._peek()
+        if char is None:
+            self._unsupported()
+        self._pos += 1
+        return char
+
+    def _alternation(self):
+        fragments = [self._concatenation()]
+        while self._peek() == '|':
+            self._next()
+            fragments += [self._concatenation()]
+        if len(fragments) == 1:
+            return fragments[0]
+        start = self._nfa.newState()
+        end = self._nfa.newState()
+        for first, last in fragments:
+            self._nfa.epsilon[start] += [first]
+            self._nfa.epsilon[last] += [end]
+        return (start, end)
+
+    def _concatenation(self):
+        start = end = self._nfa.newState()
+        while self._peek() not in (None, '|', ')'):
+            first, last = self._repetition()
+            self._nfa.epsilon[end] += [first]
+            end = last
+        return (start, end)
+
+    def _repetition(self):
+        fragment = self._atom()
+        while self._peek() is not None and self._peek() in '*+?':
+            quantifier = self._next()
+            if self._peek() == '?':
+                self._unsupported()
+            first, last = fragment
+            start = self._nfa.newState()
+            end = self._nfa.newState()
+            self._nfa.epsilon[start] += [first]
+            self._nfa.epsilon[last] += [end]
+            if quantifier in '*?':
+                self._nfa.epsilon[start] += [end]
+            if quantifier in '*+':
+                self._nfa.epsilon[last] += [first]
+            fragment = (start, end)
+        return fragment
+
+    def _atom(self):
+        char = self._next()
+        if char == '(':
+            if self._pattern.startswith('?:', self._pos):
+                self._pos += 2
+            elif self._peek() == '?':
+                self._unsupported()
+            fragment = self._alternation()
+            if self._next() != ')':
+                self._unsupported()
+            return fragment
+        if char == '[':
+            return self._symbols(self._charClass())
+        if char == '.':
+            return self._symbols(ALPHABET - ESCAPES['n'])
+        if char == '$':
+            start = self._nfa.newState()
+            end = self._nfa.newState()
+            self._nfa.eol[start] += [end]
+            return (start, end)
+        if char == '\\':
+            return self._symbols(self._escape())
+        if char in '^*+?{}|)':
+            self._pos -= 1
+            self._unsupported()
+        return self._symbols(frozenset([ord(char)]))
+
+    def _escape(self):
+        char = self._next()
+        if char in ESCAPES:
+            return ESCAPES[char]
+        if char.isalnum():
+            self._pos -= 2
+            self._unsupported()
+        return frozenset([ord(char)])
+
+    def _charClass(self):
+        negated = self._peek() == '^'
+        if negated:
+            self._next()
+        symbols = set()
+        first = True
+        while first or self._peek() != ']':
+            first = False
+            char = self._next()
+            if char == '\\':
+                chars = self._escape()
+            else:
+                chars = frozenset([ord(char)])
+            if (self._peek() == '-' and len(chars) == 1 and
+                    self._pattern[self._pos+1:self._pos+2] not in ('', ']')):
+                self._next()
+                last = self._next()
+                if last == '\\':
+                    last = self._escape()
+                    if len(last) != 1:
+                        self._unsupported()
+                    last = list(last)[0]
+                else:
+                    last = ord(last)
+                chars = frozenset(range(list(chars)[0], last + 1))
+            symbols |= chars
+        self._next()
+        if negated:
+            return ALPHABET - symbols
+        return frozenset(symbols)
+
+    def _symbols(self, symbols):
+        start = self._nfa.newState()
+        end = self._nfa.newState()
+        self._nfa.edges[start] += [(symbols, end)]
+        return (start, end)
+
+
+class DFABuilder(object):
+    """
+    Builds the transition table of a DFA that recognizes the lexemes of all
+    the given token classes at once, by subset construction.
+
+    Every DFA state remembers the first token class, in the order of the
+    list, that accepts there, and the first one that still may accept
+    further on. The scanner uses them to choose the same token class that
+    trying the patterns in order would: the first one that matches, with its
+    longest match, which is what their greedy patterns match.
+    """
+
+    def __init__(self, token_classes):
+        self._token_classes = token_classes
+        self._classes, self._keywords = Scanner.splitReserved(token_classes)
+
+    def _buildNFA(self):
+        # One NFA for all the patterns, from a start state with epsilon
+        # transitions to the start of each one. Returns it with its start
+        # state, the token class accepted by each final state, and the token
+        # class whose pattern each state comes from.
+        nfa = NFA()
+        start = nfa.newState()
+        accepting = {}
+        owner = [len(self._classes)]
+        for index, tk in enumerate(self._classes):
+            pattern = tk._pattern
+            word_start = pattern.startswith(r'\b')
+            if word_start:
+                pattern = pattern[2:]
+            first, last = PatternParser(pattern, nfa).parse()
+            if last in nfa.closure([first], at_eol=True):
+                raise PatternNotSupportedException(
+                    "Pattern %r matches the empty string" % tk._pattern
+                    )
+            if word_start:
+                first = self._wordStart(nfa, first)
+            nfa.epsilon[start] += [first]
+            accepting[last] = index
+            owner += [index] * (nfa.size() - len(owner))
+        return (nfa, start, accepting, owner)
+
+    def startChars(self):
+        """
+        Returns the set of characters that the lexeme of some token class may
+        start with, without building the DFA.
+        """
+        nfa, start, accepting, owner = self._buildNFA()
+        symbols = set()
+        for state in nfa.closure([start]):
+            for edge_symbols, target in nfa.edges[state]:
+                symbols |= edge_symbols
+        return set(chr(symbol) for symbol in symbols if symbol < OTHER)
+
+    def build(self):
+        nfa, start, accepting, owner = self._buildNFA()
+        none = len(self._classes)
+        states = {}
+        order = []
+        transitions = []
+
+        def dfaState(nfa_states):
+            if len(nfa_states) == 0:
+                return -1
+            if nfa_states not in states:
+                states[nfa_states] = len(order)
+                order.append(nfa_states)
+            return states[nfa_states]
+
+        dfaState(nfa.closure([start]))
+        index = 0
+        while index < len(order):
+            row = []
+            for symbol in xrange(OTHER + 1):
+                targets = set()
+                for state in order[index]:
+                    for symbols, target in nfa.edges[state]:
+                        if symbol in symbols:
+                            targets.add(target)
+                row += [dfaState(nfa.closure(targets))]
+            transitions += [row]
+            index += 1
+
+        accept = []
+        eol_accept = []
+        alive = []
+        for nfa_states in order:
+            accept += [min([accepting[s] for s in nfa_states if s in accepting] or [none])]
+            at_eol = nfa.closure(nfa_states, at_eol=True)
+            eol_accept += [min([accepting[s] for s in at_eol if s in accepting] or [none])]
+            alive += [min([owner[s] for s in nfa_states if s != start] or [none])]
+
+        # Symbols with the same column in the table share a symbol class
+        columns = {}
+        symbol_classes = []
+        for symbol in xrange(OTHER + 1):
+            column = tuple(row[symbol] for row in transitions)
+            if column not in columns:
+                columns[column] = len(columns)
+            symbol_classes += [columns[column]]
+        table = [None] * len(transitions)
+        for i in xrange(len(transitions)):
+            row = [None] * len(columns)
+            for symbol in xrange(OTHER + 1):
+                row[symbol_classes[symbol]] = transitions[i][symbol]
+            table[i] = tuple(row)
+
+        keywords = {}
+        for name, words in self._keywords.items():
+            keywords[name] = dict((word, tk.__name__) for word, tk in words.items())
+        self._tables = {
+            'signature'   : signature(self._token_classes),
+            'kinds'       : tuple(tk.__name__ for tk in self._classes),
+            'keywords'    : keywords,
+            'symbols'     : tuple(symbol_classes),
+            'transitions' : tuple(table),
+            'accept'      : tuple(accept),
+            'eol_accept'  : tuple(eol_accept),
+            'alive'       : tuple(alive)
+            }
+        return self._tables
+
+    @staticmethod
+    def _wordStart(nfa, first):
+        # A leading '\b' asks for the lexeme to start with a word character:
+        # a new start state only takes the transitions on word characters of
+        # the old one.
+        start = nfa.newState()
+        for state in nfa.closure([first]):
+            for symbols, target in nfa.edges[state]:
+                nfa.edges[start] += [(symbols & WORD, target)]
+        return start
+
+    def write(self, filename):
+        """
+        Writes the tables, building them if needed, as a python module.
+        """
+        try:
+            tables = self._tables
+        except AttributeError:
+            tables = self.build()
+        output = open(filename, 'w')
+        output.write("# %s\n" % filename.split('/')[-1])
+        output.write("# This file is automatically generated by lexer.dfa. Do not edit.\n")
+        for name in ('signature', 'kinds', 'keywords', 'symbols',
+                     'transitions', 'accept', 'eol_accept', 'alive'):
+            output.write("_%s = %r\n" % (name, tables[name]))
+        output.close()
+
+
+class DFAMatch(object):
+    """
+    The part of a regex match object the lexer uses.
+    """
+    __slots__ = ('_text', '_start', '_end')
+
+    def __init__(self, text, start, end):
+        self._text = text
+        self._start = start
+        self._end = end
+
+    def start(self):
+        return self._start
+
+    def end(self):
+        return self._end
+
+    def group(self):
+        return self._text[self._start:self._end]
+
+
+class DFAScanner(object):
+    """
+    Matches lexemes running the DFA of the given tables, a module written
+    by DFABuilder, which must have been built from 'token_classes'. Has the
+    same interface of Scanner.
+    """
+
+    def __init__(self, tables, token_classes):
+        if tables._signature != signature(token_classes):
+            raise TablesOutOfDateException()
+        by_name = dict((tk.__name__, tk) for tk in token_classes)
+        self._kinds = [by_name[name] for name in tables._kinds]
+        self._keywords = {}
+        for name, words in tables._keywords.items():
+            self._keywords[by_name[name]] = dict(
+                (word, by_name[kw]) for word, kw in words.items()
+                )
+        self._symbols = tables._symbols
+        self._transitions = tables._transitions
+        self._accept = tables._accept
+        self._eol_accept = tables._eol_accept
+        self._alive = tables._alive
+        self._none = len(self._kinds)
+
+    def startChars(self):
+        """
+        Returns the set of characters that the lexeme of some token class may
+        start with.
+        """
+        return set(chr(symbol) for symbol in xrange(OTHER)
+                   if self._transitions[0][self._symbols[symbol]] >= 0)
+
+    def match(self, text, pos=0):
+        symbols = self._symbols
+        transitions = self._transitions
+        accept = self._accept
+        alive = self._alive
+        end = len(text)
+        best = self._none
+        best_end = -1
+        state = 0
+        i = pos
+        while True:
+            if accept[state] <= best:
+                best = accept[state]
+                best_end = i
+            if i == end:
+                if self._eol_accept[state] <= best:
+                    best = self._eol_accept[state]
+                    best_end = i
+                break
+            symbol = ord(text[i])
+            if symbol > OTHER:
+                symbol = OTHER
+            state = transitions[state][symbols[symbol]]
+            if state < 0 or alive[state] > best:
+                break
+            i += 1
+        if best == self._none:
+            return None
+        tk = self._kinds[best]
+        if tk in self._keywords:
+            tk = self._keywords[tk].get(text[pos:best_end], tk)
+        return (tk, DFAMatch(text, pos, best_end))
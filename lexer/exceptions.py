@@ -18,6 +18,12 @@ class InputNotProvidedException(Exception):
 class PatternNotDefinedException(Exception):
     pass
 
+class PatternNotSupportedException(Exception):
+    pass
+
+class TablesOutOfDateException(Exception):
+    pass
+
 class LexicographicalError(Exception):
 
     def __init__(self, errors, *args, **kwargs):
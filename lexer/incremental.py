@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# incremental.py
+#
+# Lexer that re-scans only the lines touched by an edit
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+from exceptions import LexicographicalError
+from lexer import Lexer
+
+class IncrementalLexer(Lexer):
+    """
+    Lexer that keeps what it finds line by line. No token spans more than one
+    line, so after an edit only the lines that were replaced are scanned
+    again, and the rest keep their tokens. Line numbers are given to the
+    tokens when they are handed out, so the lines after an edit do not need
+    to be visited to shift them.
+    """
+
+    def __init__(self, module=None, inputString=None, debug=False, save_comments=False, silent=True, tables=None):
+        Lexer.__init__(self, module, inputString, debug, save_comments, silent, tables=tables)
+
+    def build(self):
+        Lexer.build(self)
+        self._line_tokens   = None
+        self._line_comments = None
+        self._line_errors   = None
+        self._error_count   = 0
+
+    def lex(self, silent=None):
+        if silent is not None:
+            self._silent = silent
+        self._checkInput()
+        self._line_tokens   = []
+        self._line_comments = []
+        self._line_errors   = []
+        self._error_count   = 0
+        self._relex(0, 0, [line for offset, line in self._lines()])
+        return self._finish()
+
+    def edit(self, first, last, text=None):
+        """
+        Replaces lines 'first' through 'last' (numbered from 1, both included)
+        with the lines of 'text', or removes them if 'text' is None. Lines are
+        inserted before line 'first' by giving 'last' as first - 1.
+
+        As lex() does, raises LexicographicalError if there are errors
+        anywhere in the input after the edit. The edit is kept anyway, so a
+        later one can fix them.
+        """
+        if self._line_tokens is None:
+            try:
+                self.lex(silent=True)
+            except LexicographicalError:
+                pass
+        if not 1 <= first <= last + 1 <= len(self._line_tokens) + 1:
+            raise IndexError("lines %d to %d are not in the input" % (first, last))
+        lines = []
+        if text is not None:
+            lines = self._newline.split(text)
+        self._relex(first - 1, last, lines)
+        return self._finish()
+
+    def _relex(self, start, stop, lines):
+        tokens, comments, errors = [], [], []
+        for line in lines:
+            self._found_tokens   = []
+            self._found_comments = []
+            self._found_errors   = []
+            self._line_count     = start + len(tokens) + 1
+            self._col_count      = 1
+            self._lexLine(line)
+            if self._debug: print "=============================================\n"
+            tokens   += [self._found_tokens]
+            comments += [self._found_comments]
+            errors   += [self._found_errors]
+        for found in self._line_errors[start:stop]:
+            self._error_count -= len(found)
+        for found in errors:
+            self._error_count += len(found)
+        self._line_tokens[start:stop]   = tokens
+        self._line_comments[start:stop] = comments
+        self._line_errors[start:stop]   = errors
+
+    def _finish(self):
+        self._found_errors = []
+        if self._error_count > 0:
+            for line_no, found in enumerate(self._line_errors):
+                for error in found:
+                    error.setLine(line_no + 1)
+                self._found_errors += found
+            raise LexicographicalError(self._found_errors)
+        if not self._silent:
+            for token in self._numbered(self._line_tokens):
+                print token
+        self._lexed = True
+        self._tokens_generator = self.tokenGenerator()
+        return self._SUCCESS
+
+    def tokenGenerator(self):
+        for token in self._numbered(self._line_tokens):
+            self.lineno = token.lineno
+            self.lexpos = token.lexpos
+            yield token
+
+    def getComments(self):
+        return list(self._numbered(self._line_comments))
+
+    @staticmethod
+    def _numbered(lines):
+        for line_no, found in enumerate(lines):
+            for token in found:
+                token.lineno = line_no + 1
+                yield token
@@ -10,24 +10,36 @@
 # ------------------------------------------------------------
 from exceptions import (TokensNotDefinedException,
                         InputNotProvidedException,
+                        TablesOutOfDateException,
                         LexicographicalError)
-from token import UnexpectedToken
+from token import UnexpectedToken, LexToken
+from scanner import Scanner
+from dfa import DFAScanner
+from buffer import TokenBuffer
 import re
 
 class Lexer():
 
     _SUCCESS = 0
+    _whitespace = re.compile(r'\s+')
+    _newline = re.compile(r'[\n\r]')
 
-    def __init__(self, module=None, inputString=None, debug=False, save_comments=False, silent=True):
-        self.reset(module, inputString, debug, save_comments, silent)
+    def __init__(self, module=None, inputString=None, debug=False, save_comments=False, silent=True, stream=False, compact=False, tables=None, max_errors=None, cache=None):
+        self.reset(module, inputString, debug, save_comments, silent, stream, compact, tables, max_errors, cache)
 
-    def reset(self, module=None, inputString=None, debug=False, save_comments=False, silent=True):
+    def reset(self, module=None, inputString=None, debug=False, save_comments=False, silent=True, stream=False, compact=False, tables=None, max_errors=None, cache=None):
         if inputString is not None and inputString != '':
             self._inputString = inputString
         self._module = module
         self._debug = debug
         self._save_comments = save_comments
         self._silent = silent
+        self._stream = stream
+        # Tokens are cached as the arrays of a TokenBuffer
+        self._compact = compact or cache is not None
+        self._tables = tables
+        self._max_errors = max_errors
+        self._cache = cache
         if module is not None:
             self.build()
 
@@ -35,6 +47,8 @@ class Lexer():
         if self._module is None:
             raise TokensNotDefinedException()
         self._token_list         = self._module.token_classes
+        self._scanner            = self._buildScanner()
+        self._error_run          = self._buildErrorRun()
         self._currentError       = UnexpectedToken()
         self._found_tokens       = []
         if self._save_comments:
@@ -47,14 +61,46 @@ class Lexer():
         self.lineno              = 0
         self.lexpos              = 0
 
+    def _buildScanner(self):
+        # The table-driven scanner is used when tables built from the same
+        # token classes are given, the regex based one otherwise.
+        if self._tables is not None:
+            try:
+                return DFAScanner(self._tables, self._token_list)
+            except TablesOutOfDateException:
+                pass
+        return Scanner(self._token_list)
+
+    def _buildErrorRun(self):
+        # Characters that no lexeme starts with can not end an error, so
+        # runs of them are skipped at once while looking for its end.
+        starts = self._scanner.startChars()
+        if starts is None:
+            return None
+        skipped = ''
+        for char in map(chr, xrange(256)):
+            if char not in starts and self._whitespace.match(char) is None:
+                skipped += re.escape(char)
+        if skipped == '':
+            return None
+        return re.compile('[%s]+' % skipped)
+
     def input(self, inputString=None):
         if inputString is not None and inputString != '':
             self._inputString = inputString
+        if self._stream:
+            self._checkInput()
+            self._tokens_generator = self.streamGenerator()
+            return self._SUCCESS
         return self.lex(silent=True)
 
     def token(self):
-        if not self._lexed:
-            self.lex()
+        if self._tokens_generator is None:
+            if self._stream:
+                self._checkInput()
+                self._tokens_generator = self.streamGenerator()
+            else:
+                self.lex()
         try:
             return self._tokens_generator.next()
         except StopIteration:
@@ -62,26 +108,59 @@ class Lexer():
 
     def tokenGenerator(self):
         for token in self._found_tokens:
-            token.makePLYable()
             self.lineno = token.lineno
             self.lexpos = token.lexpos
             yield token
 
-    def lex(self, silent=None):
-        if silent is not None:
-            self._silent = silent
-        if self._module is None:
-            raise TokensNotDefinedException()
-        if self._inputString is None or self._inputString == '':
-            raise InputNotProvidedException()
-        newline = re.compile(r'[\n\r]')
-        for line in newline.split(self._inputString):
+    def streamGenerator(self):
+        """
+        Scans the input only as far as the next token each time it is asked
+        for one, without keeping the tokens already given. Once a
+        lexicographical error is found no more tokens are given: the rest of
+        the input is scanned just to collect every error, and they are all
+        raised together, as lex() does.
+        """
+        for offset, line in self._lines():
+            if self._tooManyErrors(): break
             self._col_count = 1
-            self._lexLine(line)
+            for tk, match in self._scanLine(line):
+                token = LexToken(tk, tk.getLexeme(match.group()), self._line_count, match.start() + 1)
+                if tk.isComment():
+                    if self._save_comments:
+                        self._found_comments += [token]
+                elif len(self._found_errors) == 0:
+                    if not self._silent: print token
+                    self.lineno = token.lineno
+                    self.lexpos = token.lexpos
+                    yield token
             if self._debug: print "=============================================\n"
             self._line_count += 1
+        self._lexed = True
         if len(self._found_errors) > 0:
             raise LexicographicalError(self._found_errors)
+
+    def lex(self, silent=None):
+        if silent is not None:
+            self._silent = silent
+        self._checkInput()
+        cached = None
+        if self._usesCache():
+            cached = self._cache.load(self._inputString)
+        if cached is not None:
+            self._found_tokens = cached
+        else:
+            if self._compact:
+                self._found_tokens = TokenBuffer(self._inputString, self._token_list)
+            for offset, line in self._lines():
+                if self._tooManyErrors(): break
+                self._col_count = 1
+                self._lexLine(line, offset)
+                if self._debug: print "=============================================\n"
+                self._line_count += 1
+            if len(self._found_errors) > 0:
+                raise LexicographicalError(self._found_errors)
+            if self._usesCache():
+                self._cache.store(self._inputString, self._found_tokens)
         if not self._silent:
             for token in self._found_tokens:
                     print token
@@ -89,63 +168,111 @@ class Lexer():
         self._tokens_generator = self.tokenGenerator()
         return self._SUCCESS
 
+    def _usesCache(self):
+        # Comments are not cached
+        return self._cache is not None and not self._save_comments
+
+    def _checkInput(self):
+        if self._module is None:
+            raise TokensNotDefinedException()
+        if self._inputString is None or self._inputString == '':
+            raise InputNotProvidedException()
+
+    def _lines(self):
+        # Same lines as self._newline.split(self._inputString), one at a time,
+        # along with the offset in the input where each one starts
+        start = 0
+        for newline in self._newline.finditer(self._inputString):
+            yield (start, self._inputString[start:newline.start()])
+            start = newline.end()
+        yield (start, self._inputString[start:])
+
     def _finishError(self):
         if self._currentError.isInit():
             self._found_errors += [self._currentError]
             self._currentError = None
             self._currentError = UnexpectedToken()
 
-    def _updateError(self, line):
+    def _tooManyErrors(self):
+        return self._max_errors is not None and len(self._found_errors) >= self._max_errors
+
+    def _updateError(self, line, pos, end=None):
+        if end is None:
+            end = pos + 1
         if self._currentError.isInit():
-            self._currentError.addToValue(line[0])
+            self._currentError.addToValue(line[pos:end])
             self._currentError.setEndPos(
-                self._currentError.getEndPos() + 1
+                self._currentError.getEndPos() + end - pos
                 )
         else:
             self._currentError.setLine(self._line_count)
             self._currentError.setColumn(self._col_count)
-            self._currentError.setEndPos(self._col_count+1)
-            self._currentError.addToValue(line[0])
-        self._col_count += 1
-        line = line[1:]
-        self._lexLine(line)
+            self._currentError.setEndPos(self._col_count + end - pos)
+            self._currentError.addToValue(line[pos:end])
+        self._col_count += end - pos
 
+    def _errorEnd(self, line, pos):
+        # End of the run of characters from 'pos', where no token matches,
+        # that make up a single unexpected token
+        end = len(line)
+        pos += 1
+        while pos < end:
+            if self._error_run is not None:
+                skipped = self._error_run.match(line, pos)
+                if skipped is not None:
+                    pos = skipped.end()
+                    continue
+            if self._whitespace.match(line, pos) is not None:
+                break
+            if self._scanner.match(line, pos) is not None:
+                break
+            pos += 1
+        return pos
 
+    def _lexLine(self, line, offset=0):
+        for tk, match in self._scanLine(line):
+            if tk.isComment():
+                if self._save_comments:
+                    self._found_comments += [
+                        LexToken(tk, tk.getLexeme(match.group()), self._line_count, match.start() + 1)
+                        ]
+            elif self._compact:
+                self._found_tokens.append(tk,
+                                          offset + match.start(),
+                                          offset + match.end(),
+                                          self._line_count,
+                                          match.start() + 1)
+            else:
+                self._found_tokens += [
+                    LexToken(tk, tk.getLexeme(match.group()), self._line_count, match.start() + 1)
+                    ]
 
-    def _lexLine(self, line):
+    def _scanLine(self, line):
         if self._debug: print "line %02d: '%s'" % (self._line_count, line)
-        if line == '':
-            self._finishError()
-            return
-        pattern = r'\s+'
-        regex = re.compile(pattern)
-        spaces = regex.match(line)
-        if spaces is not None:
+        pos = 0
+        end = len(line)
+        while pos < end:
+            if self._tooManyErrors(): break
+            spaces = self._whitespace.match(line, pos)
+            if spaces is not None:
+                self._finishError()
+                self._col_count += spaces.end() - pos
+                pos = spaces.end()
+                if self._debug: print "whitespace: ('%s'), _col_count: %s" % (spaces.group(), self._col_count)
+                continue
+            found = self._scanner.match(line, pos)
+            if found is None:
+                error_end = self._errorEnd(line, pos)
+                self._updateError(line, pos, error_end)
+                pos = error_end
+                continue
             self._finishError()
-            line = line[spaces.end():]
-            self._col_count = self._col_count + spaces.end()
-            if self._debug: print "whitespace: ('%s'), _col_count: %s" % (spaces.group(), self._col_count)
-            if line == '': return
-        matched = False
-        next_start = 0
-        for tk in self._token_list:
-            test_token = tk()
-            token = test_token.match(
-                self._line_count, self._col_count, line)
-            if token is not None:
-                matched = True
-                next_start = token.getSpan()
-                self._col_count = token.getEndPos() + 1
-                if token.isComment():
-                    if self._save_comments:
-                        self._found_comments += [token]
-                else:
-                    self._found_tokens += [token]
-                if self._debug: print "token: (%s), _col_count: %s" % (token, self._col_count)
-                break
-        if not matched:
-            self._updateError(line)
-        else:
-            self._finishError()
-            if len(line) > 0:
-                self._lexLine(line[next_start:])
\ No newline at end of file
+            tk, match = found
+            self._col_count += match.end() - pos
+            pos = match.end()
+            if self._debug: print "token: (%s), _col_count: %s" % (
+                tk.describe(self._line_count, match.start() + 1, tk.getLexeme(match.group())),
+                self._col_count
+                )
+            yield found
+        self._finishError()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# parallel.py
+#
+# Lexer that splits its input among a pool of processes
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+from exceptions import LexicographicalError
+from token import UnexpectedToken, LexToken
+from buffer import TokenBuffer
+from lexer import Lexer
+from itertools import izip
+import multiprocessing
+
+class ParallelLexer(Lexer):
+    """
+    Lexer that splits its input in chunks of 'chunk_size' lines and lexes
+    them in a pool of 'workers' processes (as many as processors, by
+    default). Lines are lexed on their own, so putting together what is found
+    in each chunk, in order, gives the same tokens and errors as Lexer.
+
+    The workers import the token classes and tables by the name of their
+    modules, so both must be importable. Debug output is not printed by the
+    workers.
+    """
+
+    def __init__(self, module=None, inputString=None, debug=False, save_comments=False, silent=True, compact=False, tables=None, max_errors=None, workers=None, chunk_size=20000):
+        self._workers = workers
+        self._chunk_size = chunk_size
+        Lexer.__init__(self, module, inputString, debug, save_comments, silent, compact=compact, tables=tables, max_errors=max_errors)
+
+    def lex(self, silent=None):
+        if silent is not None:
+            self._silent = silent
+        self._checkInput()
+        chunks = list(self._chunks())
+        if len(chunks) == 1:
+            return Lexer.lex(self)
+        if self._compact:
+            self._found_tokens = TokenBuffer(self._inputString, self._token_list)
+        pool = multiprocessing.Pool(self._workers)
+        try:
+            for (line_no, offset, text), found in izip(chunks, pool.imap(_lexChunk, self._jobs(chunks))):
+                self._addChunk(offset, *found)
+                if self._tooManyErrors(): break
+        finally:
+            pool.terminate()
+            pool.join()
+        self._line_count = line_no + text.count('\n') + text.count('\r') + 1
+        if len(self._found_errors) > 0:
+            raise LexicographicalError(self._found_errors)
+        if not self._silent:
+            for token in self._found_tokens:
+                    print token
+        self._lexed = True
+        self._tokens_generator = self.tokenGenerator()
+        return self._SUCCESS
+
+    def _chunks(self):
+        # Tuples with the number of the first line of each chunk, the offset
+        # in the input where it starts and its text. Chunks are cut at line
+        # separators, which are left out of both chunks.
+        line_no = 1
+        start = 0
+        newlines = 0
+        for newline in self._newline.finditer(self._inputString):
+            newlines += 1
+            if newlines == self._chunk_size:
+                yield (line_no, start, self._inputString[start:newline.start()])
+                line_no += newlines
+                start = newline.end()
+                newlines = 0
+        yield (line_no, start, self._inputString[start:])
+
+    def _jobs(self, chunks):
+        tables = None
+        if self._tables is not None:
+            tables = self._tables.__name__
+        for line_no, offset, text in chunks:
+            yield (self._module.__name__, tables, self._save_comments, self._max_errors, line_no, text)
+
+    def _addChunk(self, offset, arrays, comments, errors):
+        if self._compact:
+            self._found_tokens.extend(arrays, offset)
+        else:
+            for kind, start, end, line, column in zip(*arrays):
+                tk = self._token_list[kind]
+                value = tk.getLexeme(self._inputString[offset+start:offset+end])
+                self._found_tokens += [LexToken(tk, value, line, column)]
+        if self._save_comments:
+            for kind, value, line, column in comments:
+                self._found_comments += [LexToken(self._token_list[kind], value, line, column)]
+        for line, column, end_pos, value in errors:
+            if self._tooManyErrors(): break
+            error = UnexpectedToken()
+            error.setLine(line)
+            error.setColumn(column)
+            error.setEndPos(end_pos)
+            error.setValue(value)
+            self._found_errors += [error]
+
+
+_lexers = {}
+
+def _lexChunk(job):
+    """
+    Lexes a chunk of the input in a worker process. Returns the arrays of
+    the tokens found, with offsets from the start of the chunk, and the
+    comments and errors found as tuples.
+    """
+    module, tables, save_comments, max_errors, line_no, text = job
+    key = (module, tables, save_comments, max_errors)
+    if key not in _lexers:
+        if tables is not None:
+            tables = __import__(tables, fromlist=[''])
+        _lexers[key] = Lexer(module=__import__(module, fromlist=['']),
+                             save_comments=save_comments,
+                             compact=True,
+                             tables=tables,
+                             max_errors=max_errors)
+    lexer = _lexers[key]
+    lexer.build()
+    lexer._found_tokens = TokenBuffer(text, lexer._token_list)
+    lexer._inputString = text
+    lexer._line_count = line_no
+    if text != '':
+        try:
+            lexer.lex(silent=True)
+        except LexicographicalError:
+            pass
+    ids = dict((tk, i) for i, tk in enumerate(lexer._token_list))
+    comments = []
+    if save_comments:
+        comments = [(ids[c.kind], c.value, c.lineno, c.lexpos) for c in lexer._found_comments]
+    errors = [(e.getLine(), e.getColumn(), e.getEndPos(), e.getValue()) for e in lexer._found_errors]
+    return (lexer._found_tokens.getArrays(), comments, errors)
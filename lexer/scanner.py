@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+# scanner.py
+#
+# Scanning engine: matches all the token classes of a
+# lexical specification with a single regular expression
+#
+# Authors:
+# Victor De Ponte, 05-38087, <rdbvictor19@gmail.com>
+# Francisco Martinez, 09-10502, <frammnm@gmail.com>
+# ------------------------------------------------------------
+from exceptions import (PatternNotDefinedException,
+                        PatternNotSupportedException)
+import re
+
+class Scanner(object):
+    """
+    Compiles the patterns of every token class into one alternation of named
+    groups, in the same order of the token list, so the first class whose
+    pattern matches is the one chosen, as if they were tried one by one.
+
+    Reserved words, token classes whose pattern is just '\\bword\\b', are not
+    given a group of their own when they come right before a token class that
+    matches all of them, like an identifier does. That class is matched
+    instead, and the lexeme is looked up in a table of reserved words.
+    """
+
+    _reserved_word = re.compile(r'\\b(\w+)\\b$')
+
+    def __init__(self, token_classes):
+        self._token_classes = token_classes
+        classes, self._keywords = self.splitReserved(token_classes)
+        self._classes = {}
+        alternatives = []
+        for tk in classes:
+            self._classes[tk.__name__] = tk
+            alternatives += [self._group(tk)]
+        self._regex = re.compile('|'.join(alternatives))
+
+    @classmethod
+    def splitReserved(cls, token_classes):
+        """
+        Returns the token classes that need to be matched, in order, and the
+        table of reserved words for each class standing for them.
+        """
+        classes = []
+        keywords = {}
+        reserved = []
+        for tk in token_classes:
+            try:
+                pattern = tk._pattern
+            except AttributeError:
+                raise PatternNotDefinedException()
+            word = cls._reserved_word.match(pattern)
+            if word is not None:
+                reserved += [(word.group(1), tk)]
+                continue
+            if reserved and cls._matchesAll(pattern, reserved):
+                keywords[tk.__name__] = dict(reserved)
+            else:
+                classes += [kw for word, kw in reserved]
+            reserved = []
+            classes += [tk]
+        classes += [kw for word, kw in reserved]
+        return (classes, keywords)
+
+    @staticmethod
+    def _matchesAll(pattern, reserved):
+        # Identifiers are made of word characters, so when the identifier
+        # matched is not a reserved word, none of them could have matched.
+        regex = re.compile('(?:%s)$' % pattern)
+        for word, kw in reserved:
+            if regex.match(word) is None:
+                return False
+        return True
+
+    def _group(self, tk):
+        return '(?P<%s>%s)' % (tk.__name__, self._anchor(tk._pattern))
+
+    def getKeywords(self):
+        """
+        Returns a dictionary from the name of each token class that stands for
+        reserved words to a dictionary from those words to their token class.
+        """
+        return self._keywords
+
+    @staticmethod
+    def _anchor(pattern):
+        # Token patterns used to be matched against the rest of the line, so
+        # a leading '\b' only asked for the lexeme to start with a word
+        # character. Matching in place, the character before 'pos' would be
+        # taken into account too.
+        if pattern.startswith(r'\b'):
+            return r'(?=\w)' + pattern[2:]
+        return pattern
+
+    def startChars(self):
+        """
+        Returns the set of characters that the lexeme of some token class may
+        start with, or None if the patterns are beyond what lexer.dfa can
+        tell.
+        """
+        from dfa import DFABuilder
+        try:
+            return DFABuilder(self._token_classes).startChars()
+        except PatternNotSupportedException:
+            return None
+
+    def match(self, text, pos=0):
+        """
+        Matches a single lexeme at index 'pos' of 'text'. Returns a tuple with
+        the matching token class and the match object, or None if no token
+        matches there.
+        """
+        matched = self._regex.match(text, pos)
+        if matched is None:
+            return None
+        tk = self._classes[matched.lastgroup]
+        if matched.lastgroup in self._keywords:
+            tk = self._keywords[matched.lastgroup].get(matched.group(), tk)
+        return (tk, matched)
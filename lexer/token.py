@@ -12,32 +12,40 @@ from abc import ABCMeta, abstractmethod, abstractproperty
 from exceptions import PatternNotDefinedException
 import re
 
+class TokenType(ABCMeta):
+    """
+    Metaclass of the token classes. Whatever is common to all the tokens of a
+    class is set up once, when the class is defined: its pattern is compiled
+    and the name of the token type for PLY is chosen.
+    """
+
+    def __init__(cls, name, bases, attributes):
+        super(TokenType, cls).__init__(name, bases, attributes)
+        if attributes.get('_pattern') is not None:
+            cls._regex = re.compile(cls._pattern)
+        cls._ply_type = getattr(cls, '_grammar_name', name)
+
+
 class Token:
-    __metaclass__ = ABCMeta
+    __metaclass__ = TokenType
+
+    _shows_value = False
 
     def __init__(self, pattern=None):
         if pattern is not None:
             self._pattern = pattern
-        try:
-            if self._pattern is not None:
-                self._regex = re.compile(self._pattern)
-        except AttributeError:
-            pass
+            self._regex = re.compile(pattern)
         self._column = -1
         self._end_pos = -1
         self._line = -1
         self._value = None
-        self._shows_value = False
         self.type = self._name
         self.value = self._value
         self.lineno = self._line
         self.lexpos = self._column
 
     def makePLYable(self):
-        try:
-            self.type = self._grammar_name
-        except AttributeError:
-            self.type = self.__class__.__name__
+        self.type = self._ply_type
         self.value = self._value
         self.lineno = self._line
         self.lexpos = self._column
@@ -51,15 +59,29 @@ class Token:
         if matched is None:
             return None
         else:
-            self._line = line_no
-            self._column = col_no + matched.start()
-            self._end_pos = col_no + matched.end() - 1
-            self._value = matched.group()
-            return self
+            return self.setMatch(line_no, col_no, matched)
+
+    def setMatch(self, line_no, col_no, matched, pos=0):
+        self._line = line_no
+        self._column = col_no + matched.start() - pos
+        self._end_pos = col_no + matched.end() - pos - 1
+        self._value = self.getLexeme(matched.group())
+        return self
+
+    @classmethod
+    def getLexeme(cls, text):
+        return text
+
+    @classmethod
+    def getShownValue(cls, value):
+        return value
 
     def setValue(self, value):
         self._value = value
 
+    def getValue(self):
+        return self._value
+
     def setColumn(self, col):
         self._column = col
 
@@ -81,9 +103,22 @@ class Token:
     def getSpan(self):
         return len(self._value)
 
-    def isComment(self):
+    @classmethod
+    def isComment(cls):
         return False
 
+    @classmethod
+    def describe(cls, line, column, value):
+        shown = ''
+        if cls._shows_value:
+            shown = ": '%s'" % str(cls.getShownValue(value))
+        return "Line: %d, column: %d: %s%s" % (
+                line,
+                column,
+                cls._name,
+                shown
+            )
+
     def __repr__(self):
         return self.__unicode__()
 
@@ -91,37 +126,52 @@ class Token:
         return self.__unicode__()
 
     def __unicode__(self):
-        value = ''
-        if self._shows_value:
-            try:
-                if self._shown_value is not None:
-                    value = ": '%s'" % str(self._shown_value)    
-            except AttributeError:
-                value = ": '%s'" % str(self._value)
-        return "Line: %d, column: %d: %s%s" % (
-                self._line,
-                self._column,
-                self._name,
-                value
-            )
+        return self.describe(self._line, self._column, self._value)
 
 class OneLineComment(Token):
-    __metaclass__ = ABCMeta
+    __metaclass__ = TokenType
 
-    def isComment(self):
+    @classmethod
+    def isComment(cls):
         return True
 
 
 class UnexpectedToken(Token):
     _name = 'Unexpected Token'
-
-    def __init__(self, pattern=None):
-        super(UnexpectedToken, self).__init__(pattern=pattern)
-        self._shows_value = True
+    _shows_value = True
 
     def isInit(self):
         return self._column > -1
 
     def addToValue(self, val):
         if self._value is None: self._value = ''
-        self._value += val
\ No newline at end of file
+        self._value += val
+
+
+class LexToken(object):
+    """
+    A token found in the input, as it is handed to the parser. It only holds
+    what differs from one token to another; everything else is kept once, in
+    its token class, 'kind'.
+    """
+    # 'lexer' is only set by PLY, on the token that caused a syntax error
+    __slots__ = ('kind', 'type', 'value', 'lineno', 'lexpos', 'lexer')
+
+    def __init__(self, kind, value, lineno, lexpos):
+        self.kind = kind
+        self.type = kind._ply_type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+    def isComment(self):
+        return self.kind.isComment()
+
+    def __repr__(self):
+        return self.__unicode__()
+
+    def __str__(self):
+        return self.__unicode__()
+
+    def __unicode__(self):
+        return self.kind.describe(self.lineno, self.lexpos, self.value)